@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+
+import os
+from time import perf_counter
+
+from openset.data.generator import ClusterGenerator
+
+
+dimension = 1000
+samples = 20000
+
+
+def benchmark(function, *args, **kwargs):
+    start = perf_counter()
+    function(*args, **kwargs)
+    return perf_counter() - start
+
+
+def main():
+    generator = ClusterGenerator()
+    generator.reset(42)
+
+    for method, parameters in (('gaussian', {}),
+                               ('uniform', {}),
+                               ('mvn', {'covariance': 0.25,
+                                        'sampler': 'factor'})):
+        sequential = benchmark(getattr(generator, method),
+                               samples, dimension, **parameters)
+        print(f'{method:>10}  sequential  {sequential:7.3f} s')
+
+        for n_jobs in sorted({1, 2, 4, os.cpu_count() or 1}):
+            parallel = benchmark(generator.generate, method, samples,
+                                 n_jobs=n_jobs, dimension=dimension,
+                                 **parameters)
+            print(f'{method:>10}  {n_jobs:2d} threads  {parallel:7.3f} s  '
+                  f'speedup {sequential / parallel:5.2f}x')
+
+
+if __name__ == '__main__':
+    main()
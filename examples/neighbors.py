@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+
+from time import perf_counter
+
+import numpy as np
+
+from openset.models.neighbors import BruteNeighbors
+from openset.models.neighbors import RandomProjectionForest
+
+
+def benchmark(index, training, queries, k):
+    start = perf_counter()
+    index.fit(training)
+    build = perf_counter() - start
+
+    start = perf_counter()
+    neighbors = index.query(queries, k, return_distance=False)
+    query = perf_counter() - start
+
+    return neighbors, build, query
+
+
+def main():
+    rng = np.random.default_rng(42)
+    centers = rng.normal(scale=3, size=(20, 50))
+    training = centers[rng.integers(0, 20, size=20000)] \
+        + rng.normal(size=(20000, 50))
+    queries = centers[rng.integers(0, 20, size=1000)] \
+        + rng.normal(size=(1000, 50))
+    k = 10
+
+    exact, build, query = benchmark(BruteNeighbors(), training, queries, k)
+    print(f'{"exact":>24}  recall 1.000  '
+          f'build {build:7.3f} s  query {query:7.3f} s')
+
+    for n_trees, leaf_size in ((5, 32), (10, 32), (20, 64), (40, 64)):
+        index = RandomProjectionForest(n_trees=n_trees, leaf_size=leaf_size)
+        neighbors, build, query = benchmark(index, training, queries, k)
+
+        recall = np.mean([len(np.intersect1d(found, expected)) / k
+                          for found, expected in zip(neighbors, exact)])
+
+        print(f'{f"rpforest({n_trees}, {leaf_size})":>24}  '
+              f'recall {recall:.3f}  '
+              f'build {build:7.3f} s  query {query:7.3f} s')
+
+
+if __name__ == '__main__':
+    main()
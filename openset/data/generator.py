@@ -1,15 +1,33 @@
 #!/usr/bin/env python3
 
+from collections import OrderedDict
+from collections.abc import Callable
 from collections.abc import Iterable
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+import copy
+import hashlib
 import os
 
 import numpy as np
+from threadpoolctl import threadpool_limits
 
 
 class ClusterGenerator(object):
     '''General-purpose data clusters generator.'''
 
+    # The number of the most recently used covariance matrix factors kept
+    # by mvn_matrix(), see _factor().
+    FACTORS_CACHE_SIZE = 8
+
+    # The default number of rows of the blocks generated independently
+    # in generate() and generate_iter().
+    BLOCK_SIZE = 4096
+
+    METHODS = ('gaussian', 'mvn', 'mvn_matrix', 'triangular', 'uniform')
+
     def __init__(self):
+        self.factors = OrderedDict()
         self.reset(seed=int(os.getenv('PYTHONHASHSEED', '42')))
 
     def reset(self, seed: int = 42, legacy: bool = False) -> None:
@@ -29,6 +47,195 @@ class ClusterGenerator(object):
         else:
             self.rng = np.random.default_rng(seed)
 
+    def generate(self,
+                 method: str,
+                 samples: int = 10,
+                 n_jobs: int | None = None,
+                 block_size: int | None = None,
+                 seed: int | None = None,
+                 out: np.ndarray | None = None,
+                 **parameters) -> np.ndarray:
+        '''Generates a large data cluster in parallel threads.
+
+        The cluster is split into blocks of block_size rows, as in
+        generate_iter(), and the blocks are generated concurrently (NumPy
+        releases the GIL while sampling) by their own pseudo-random number
+        generators, directly into the disjoint rows of the result. Hence,
+        the cluster is the same for a given seed and block_size, regardless
+        of the number of threads, and equal to the one from generate_iter().
+        The result can be written into a given array (e.g. np.memmap),
+        so only the blocks are allocated temporarily; see generate_file().
+
+        Parameters
+        ----------
+        method : str
+            The name of generator method, e.g. 'gaussian' or 'mvn'.
+        samples : int
+            Number of samples in the generated cluster (default: 10).
+        n_jobs : int
+            Number of threads to use; all CPUs if negative (default: 1).
+        block_size : int
+            Number of samples in each block (default: 4096).
+        seed : int
+            The value used to seed the blocks (default: from the generator).
+        out : np.ndarray
+            The array of shape (samples, dimension) to fill (default: new).
+        **parameters
+            The parameters of method, e.g. dimension or location.
+
+        Returns
+        -------
+        cluster : np.ndarray
+            Generated array of data vectors (out, if given).
+
+        Examples
+        --------
+        >>> generator = ClusterGenerator()
+        >>> cluster = generator.generate('gaussian', samples=5, dimension=3,
+        ...                              n_jobs=2, block_size=2, seed=42)
+        >>> cluster.shape
+        (5, 3)
+        '''
+
+        def allocate(shape: tuple, dtype: np.dtype) -> np.ndarray:
+            if out is None:
+                return np.empty(shape, dtype=dtype)
+
+            if out.shape != shape:
+                raise ValueError(f'The output array must have shape {shape}')
+
+            return out
+
+        return self._generate(method, samples, n_jobs, block_size, seed,
+                              parameters, allocate)
+
+    def generate_file(self,
+                      path: str | os.PathLike,
+                      method: str,
+                      samples: int = 10,
+                      n_jobs: int | None = None,
+                      block_size: int | None = None,
+                      seed: int | None = None,
+                      dtype: np.dtype | None = None,
+                      **parameters) -> np.memmap:
+        '''Generates a large data cluster directly into the .npy file.
+
+        The file is created as a memory-mapped array and filled in place
+        by generate(), so the cluster does not have to fit in memory.
+        The file can be loaded later with np.load(path, mmap_mode='r').
+
+        Parameters
+        ----------
+        path : str or os.PathLike
+            The path of created .npy file.
+        method : str
+            The name of generator method, e.g. 'gaussian' or 'mvn'.
+        samples : int
+            Number of samples in the generated cluster (default: 10).
+        n_jobs : int
+            Number of threads to use; all CPUs if negative (default: 1).
+        block_size : int
+            Number of samples in each block (default: 4096).
+        seed : int
+            The value used to seed the blocks (default: from the generator).
+        dtype : np.dtype
+            The type of stored values (default: as generated, i.e. float64).
+        **parameters
+            The parameters of method, e.g. dimension or location.
+
+        Returns
+        -------
+        cluster : np.memmap
+            Generated array of data vectors, mapped to the file.
+        '''
+
+        def allocate(shape: tuple, default: np.dtype) -> np.memmap:
+            return np.lib.format.open_memmap(path, mode='w+', shape=shape,
+                                             dtype=dtype or default)
+
+        cluster = self._generate(method, samples, n_jobs, block_size, seed,
+                                 parameters, allocate)
+        cluster.flush()
+
+        return cluster
+
+    def generate_iter(self,
+                      method: str,
+                      samples: int = 10,
+                      chunk_size: int | None = None,
+                      block_size: int | None = None,
+                      seed: int | None = None,
+                      **parameters) -> Iterator[np.ndarray]:
+        '''Generates a large data cluster in chunks of a fixed size.
+
+        The cluster is split into blocks of block_size rows, each generated
+        by the given method with its own pseudo-random number generator,
+        seeded with the child of SeedSequence(seed) for the block index
+        (as given by SeedSequence.spawn()), and returned in chunks of
+        chunk_size rows. Hence, the whole cluster does not have to fit
+        in memory and it is the same for a given seed and block_size,
+        regardless of the chunk_size. If the seed is omitted, it is drawn
+        from the generator, so consecutive calls give different clusters.
+
+        Parameters
+        ----------
+        method : str
+            The name of generator method, e.g. 'gaussian' or 'mvn'.
+        samples : int
+            Number of samples in the generated cluster (default: 10).
+        chunk_size : int
+            Number of samples in each chunk (default: block_size).
+        block_size : int
+            Number of samples in each block (default: 4096).
+        seed : int
+            The value used to seed the blocks (default: from the generator).
+        **parameters
+            The parameters of method, e.g. dimension or location.
+
+        Yields
+        ------
+        chunk : np.ndarray
+            Generated array of consecutive data vectors.
+
+        Examples
+        --------
+        >>> generator = ClusterGenerator()
+        >>> chunks = generator.generate_iter('uniform', samples=5, seed=42,
+        ...                                  chunk_size=2, block_size=3)
+        >>> [chunk.shape for chunk in chunks]
+        [(2, 1), (2, 1), (1, 1)]
+        '''
+
+        if method not in self.METHODS:
+            raise ValueError(f'Unknown method: {method}')
+
+        block_size = block_size or self.BLOCK_SIZE
+        chunk_size = chunk_size or block_size
+
+        if seed is None:
+            seed = int.from_bytes(self.rng.bytes(16), 'little')
+
+        cached = (None, None)  # the last block, overlapping the next chunk
+
+        def block(index: int) -> np.ndarray:
+            return self._block(method, samples, block_size, seed, index,
+                               parameters)
+
+        for start in range(0, samples, chunk_size):
+            stop = min(start + chunk_size, samples)
+            parts = []
+
+            for index in range(start // block_size,
+                               (stop - 1) // block_size + 1):
+                if cached[0] != index:
+                    cached = (index, block(index))
+
+                offset = index * block_size
+                parts.append(cached[1][max(start - offset, 0):
+                                       stop - offset])
+
+            yield np.concatenate(parts)
+
     def gaussian(self,
                  samples: int = 10,
                  dimension: int = 1,
@@ -83,7 +290,8 @@ class ClusterGenerator(object):
             scale: float | Iterable[float] = 1.0,
             n_features: float = 1.0,
             n_correlated: float = 0.0,
-            covariance: float = 0.5) -> np.ndarray:
+            covariance: float = 0.5,
+            sampler: str = 'dense') -> np.ndarray:
         '''Generates a data cluster involving Multivariate Normal distribution.
 
         Similar to the Gaussian distribution, however it additionally allows to
@@ -120,6 +328,19 @@ class ClusterGenerator(object):
                  [0.   0.   0.   0.   0.   0.   0.   1.   0.   0.  ]
                  [0.   0.   0.   0.   0.   0.   0.   0.   1.   0.  ]
                  [0.   0.   0.   0.   0.   0.   0.   0.   0.   1.  ]]
+        sampler : str
+            The sampling method (default: 'dense'):
+            - 'dense' builds the covariance matrix and factorizes it with
+              the SVD in rng.multivariate_normal(), at O(dimension³) cost,
+            - 'factor' draws the correlated features as a shared latent
+              factor plus independent noise (needs 0 <= covariance <= scale
+              for them), at O(samples * dimension) cost, without the matrix,
+            - 'auto' uses 'factor' if possible, but 'dense' for the legacy
+              generator.
+            All samplers give exactly the same distribution, but not the same
+            values for a given seed, hence 'dense' is the default, so the data
+            sets generated before (e.g. cached results of experiments) remain
+            reproducible; the faster methods must be selected explicitly.
 
         Returns
         -------
@@ -148,16 +369,104 @@ class ClusterGenerator(object):
                [-1.95967012, -3.8606466 ,  0.4670332 ,  3.67853268]])
         '''
 
+        if sampler not in ('auto', 'dense', 'factor'):
+            raise ValueError(f'Unknown sampler: {sampler}')
+
         means = np.zeros(shape=(dimension,))
         means[:int(n_features * dimension)] = location
 
-        cov = np.zeros(shape=(dimension, dimension))
+        variances = np.zeros(shape=(dimension,))
+        variances[:] = scale
         index = int(n_correlated * dimension)
+
+        # The covariance matrix is the diagonal of variances plus the constant
+        # covariance between the features of the block [:index], hence the
+        # correlated features can be drawn as the sum of a factor shared by
+        # them, with the variance [covariance], and the independent noise,
+        # with the variances [variances - covariance].
+        noise = variances.copy()
+        if index > 1:
+            noise[:index] -= covariance
+        factorizable = (index <= 1 or covariance >= 0) and np.all(noise >= 0)
+        legacy = isinstance(self.rng, np.random.RandomState)
+
+        if sampler == 'factor' and not factorizable:
+            raise ValueError('The covariance matrix cannot be factorized')
+
+        if sampler == 'auto':
+            sampler = 'factor' if factorizable and not legacy else 'dense'
+
+        if sampler == 'factor':
+            cluster = self.rng.standard_normal(size=(samples, dimension))
+            cluster *= np.sqrt(noise)
+
+            if index > 1:
+                factor = self.rng.standard_normal(size=(samples, 1))
+                cluster[:, :index] += np.sqrt(covariance) * factor
+
+            cluster += means
+
+            return cluster
+
+        cov = np.zeros(shape=(dimension, dimension))
         cov[:index, :index] = covariance
         np.fill_diagonal(cov, scale)
 
         return self.rng.multivariate_normal(means, cov, size=samples)
 
+    def mvn_matrix(self,
+                   samples: int = 10,
+                   mean: float | Iterable[float] = 0.0,
+                   cov: np.ndarray | None = None) -> np.ndarray:
+        '''Generates a data cluster from explicitly given MVN distribution.
+
+        Unlike mvn(), the mean vector and the covariance matrix are given
+        directly, so any (positive semi-definite) matrix can be used.
+        The matrix is factorized as cov = A A^T (with the Cholesky or, for
+        singular matrices, the eigendecomposition) and the samples are drawn
+        as mean + A z, for the standard normal vectors z.
+        The factors of recently used matrices are cached (identified by
+        the fingerprint of matrix), so sampling multiple clusters with
+        the same matrix costs only the matrix multiplication.
+
+        Parameters
+        ----------
+        samples : int
+            Number of samples in the generated cluster (default: 10).
+        mean : float or Iterable[float]
+            The mean vector of the distribution (default: 0.0).
+        cov : np.ndarray
+            The covariance matrix of shape (dimension, dimension);
+            the identity matrix of dimension 1 by default.
+
+        Returns
+        -------
+        cluster : np.ndarray
+            Generated array of data vectors.
+
+        Examples
+        --------
+        >>> generator = ClusterGenerator()
+        >>> generator.reset(42, legacy=True)  # For tests predictability
+        >>> generator.mvn_matrix(samples=2, mean=[1, 2],
+        ...                      cov=np.array([[1.0, 0.5], [0.5, 2.0]]))
+        array([[1.49671415, 2.0654506 ],
+               [1.64768854, 4.33862339]])
+        '''
+
+        if cov is None:
+            cov = np.identity(1)
+
+        factor = self._factor(np.asarray(cov, dtype=float))
+        mean = np.broadcast_to(np.asarray(mean, dtype=float),
+                               (factor.shape[0], ))
+
+        cluster = self.rng.standard_normal(size=(samples, factor.shape[1]))
+        cluster = np.dot(cluster, factor.T)
+        cluster += mean
+
+        return cluster
+
     def triangular(self,
                    samples: int = 10,
                    dimension: int = 1,
@@ -253,3 +562,89 @@ class ClusterGenerator(object):
         shape = (samples, dimension)
 
         return self.rng.uniform(low, high, size=shape)
+
+    def _generate(self, method: str, samples: int, n_jobs: int | None,
+                  block_size: int | None, seed: int | None, parameters: dict,
+                  allocate: Callable) -> np.ndarray:
+        '''Generates the blocks of a cluster into the allocated array.'''
+        if method not in self.METHODS:
+            raise ValueError(f'Unknown method: {method}')
+
+        block_size = block_size or self.BLOCK_SIZE
+
+        if seed is None:
+            seed = int.from_bytes(self.rng.bytes(16), 'little')
+
+        if n_jobs is None:
+            workers = 1
+        elif n_jobs < 0:
+            workers = os.cpu_count() or 1
+        else:
+            workers = max(1, n_jobs)
+
+        # The first block determines the shape of vectors and the type of
+        # values of the result; generated serially, it also caches the factor
+        # in mvn_matrix() before the threads start.
+        first = self._block(method, samples, block_size, seed, 0, parameters)
+        cluster = allocate((samples, ) + first.shape[1:], first.dtype)
+        cluster[:len(first)] = first
+
+        def fill(index: int) -> None:
+            start = index * block_size
+            cluster[start:start + block_size] = self._block(
+                method, samples, block_size, seed, index, parameters
+            )
+
+        blocks = range(1, -(-samples // block_size))
+
+        if workers <= 1 or len(blocks) <= 1:
+            for index in blocks:
+                fill(index)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor, \
+                    threadpool_limits(limits=1):
+                list(executor.map(fill, blocks))
+
+        return cluster
+
+    def _block(self, method: str, samples: int, block_size: int, seed: int,
+               index: int, parameters: dict) -> np.ndarray:
+        '''Generates the given block of a cluster with its own generator.'''
+        generator = copy.copy(self)  # shares the cache of factors
+        sequence = np.random.SeedSequence(seed, spawn_key=(index, ))
+        generator.rng = np.random.default_rng(sequence)
+
+        rows = min(block_size, samples - index * block_size)
+
+        return getattr(generator, method)(samples=rows, **parameters)
+
+    def _factor(self, cov: np.ndarray) -> np.ndarray:
+        '''Returns the factor A of covariance matrix cov = A A^T (cached).'''
+        if cov.ndim != 2 or cov.shape[0] != cov.shape[1]:
+            raise ValueError('The covariance matrix must be square')
+
+        key = hashlib.sha256(np.ascontiguousarray(cov).tobytes()).hexdigest()
+        key = (cov.shape, key)
+
+        if key in self.factors:
+            self.factors.move_to_end(key)
+            return self.factors[key]
+
+        try:
+            factor = np.linalg.cholesky(cov)
+        except np.linalg.LinAlgError:  # singular, e.g. of duplicated features
+            values, vectors = np.linalg.eigh(cov)
+            tolerance = max(values.max(initial=0), 0) * cov.shape[0] \
+                * np.finfo(values.dtype).eps * 10
+
+            if values.min(initial=0) < -tolerance:
+                raise ValueError('The covariance matrix must be positive '
+                                 'semi-definite')
+
+            factor = vectors * np.sqrt(np.maximum(values, 0))
+
+        self.factors[key] = factor
+        if len(self.factors) > self.FACTORS_CACHE_SIZE:
+            self.factors.popitem(last=False)  # the least recently used
+
+        return factor
@@ -11,6 +11,7 @@ from ..models.irwd import IntegratedRankWeightedDepth
 from ..models.knn import KNearestNeighbors
 from ..models.lof import LocalOutlierFactor
 from ..models.mahalanobis import Mahalanobis
+from ..models.mahalanobis import MahalanobisLowRank
 from ..models.mahalanobis import MahalanobisSC
 from ..models.manhattan import Manhattan
 from ..models.minkowski import Minkowski
@@ -31,6 +32,7 @@ __all__ = [
     'KNearestNeighbors',
     'LocalOutlierFactor',
     'Mahalanobis',
+    'MahalanobisLowRank',
     'MahalanobisSC',
     'Manhattan',
     'Minkowski',
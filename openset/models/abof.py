@@ -1,94 +1,232 @@
 #!/usr/bin/env python3
 
-from itertools import combinations
-
 import numpy as np
-from sklearn.neighbors import KDTree
 
 from ..models.base import BaseModel
+from ..models.base import MEMORY_BUDGET
+from ..models.neighbors import build_index
+
+
+def _angle_variances(vectors: np.ndarray, weighted: bool = True,
+                     block: int | None = None) -> np.ndarray:
+    '''Calculates the variances of angles between pairs of difference vectors.
+
+    The given array of shape (T, M, D) holds T sets of M difference vectors
+    (between a query vector and the reference points) of dimension D. For each
+    set, the value of every pair of vectors (i < j) is the dot product of them
+    divided by the product of their squared norms (weighted variant) or norms
+    (unweighted variant). The pairs involving zero-length vectors are skipped.
+
+    Instead of iterating over the pairs, the values are obtained at once from
+    the Gram matrices, scaled by the inverted norms, and the variance comes
+    from the closed-form sums of the values and of their squares. As the sums
+    are additive, the Gram matrices can be computed in parts, for the pairs
+    of blocks of (at most) block vectors, to limit the memory used.
+    The values are shifted by the value of the first valid pair of each set
+    before summing, which does not change the variance, but prevents the loss
+    of precision when the values are nearly equal (e.g. for far points).
+    '''
+    vectors = vectors.astype(np.result_type(vectors, np.float32), copy=False)
+    references = vectors.shape[1]
+    block = block or references
+
+    norms = np.einsum('tmd,tmd->tm', vectors, vectors)
+    valid = norms != 0
+    if not weighted:
+        norms = np.sqrt(norms)
+
+    scales = np.zeros_like(norms)
+    np.divide(1, norms, out=scales, where=valid)
+
+    # The first pair of valid vectors in each set (if any, otherwise the scale
+    # of them is zero, and so is the shift)
+    sets = np.arange(len(vectors))
+    one = np.argmax(valid, axis=1)
+    rest = valid.copy()
+    rest[sets, one] = False
+    other = np.argmax(rest, axis=1)
+
+    shifts = np.einsum('td,td->t', vectors[sets, one], vectors[sets, other])
+    shifts *= scales[sets, one] * scales[sets, other]
+    shifts = shifts[:, np.newaxis, np.newaxis]
+
+    sums = np.zeros(len(vectors))
+    squares = np.zeros(len(vectors))
+
+    for first in range(0, references, block):
+        rows = slice(first, first + block)
+
+        for second in range(first, references, block):
+            columns = slice(second, second + block)
+
+            values = np.matmul(vectors[:, rows],
+                               vectors[:, columns].transpose(0, 2, 1))
+            values *= scales[:, rows, np.newaxis]
+            values *= scales[:, np.newaxis, columns]
+
+            pairs = valid[:, rows, np.newaxis] & valid[:, np.newaxis, columns]
+            np.subtract(values, shifts, out=values, where=pairs)
+
+            # The sums are accumulated in float64 even for float32 data, as the
+            # variance suffers from the cancellation. The blocks off the
+            # diagonal stand also for their transpositions.
+            if first == second:
+                sums += values.sum(axis=(1, 2), dtype=np.float64) \
+                    - np.trace(values, axis1=1, axis2=2, dtype=np.float64)
+                values **= 2
+                squares += values.sum(axis=(1, 2), dtype=np.float64) \
+                    - np.trace(values, axis1=1, axis2=2, dtype=np.float64)
+            else:
+                sums += 2 * values.sum(axis=(1, 2), dtype=np.float64)
+                values **= 2
+                squares += 2 * values.sum(axis=(1, 2), dtype=np.float64)
+
+    samples = valid.sum(axis=1)
+    pairs = samples * (samples - 1)  # each pair is counted twice in sums
+
+    variances = np.full(len(vectors), np.nan)
+    mask = pairs > 0
+    means = sums[mask] / pairs[mask]
+    variances[mask] = np.maximum(squares[mask] / pairs[mask] - means**2, 0)
+
+    return variances
+
+
+def _angle_tiles(memory_budget: int, samples: int, dimension: int) -> tuple:
+    '''Returns the numbers of query vectors and of references in a tile.
+
+    The query vectors are grouped in tiles, each with the difference vectors
+    (to all the samples references) and the Gram matrix within the budget.
+    If a single query vector exceeds the budget, the Gram matrix is computed
+    in parts, for the blocks of references, see _angle_variances().
+    '''
+    size = 8 * samples * (dimension + samples)  # vectors and Gram matrix
+    tile = memory_budget // size
+
+    if tile >= 1:
+        return tile, samples
+
+    block = int(np.sqrt(max(1, memory_budget // 8 - samples * dimension)))
+
+    return 1, min(samples, max(1, block))
 
 
 class AngleBasedOutlierFactor(BaseModel):
     '''Angle-based outlier factor distance.'''
 
+    def __init__(self, memory_budget=MEMORY_BUDGET, dtype=None, n_jobs=None,
+                 backend='threads'):
+        super().__init__(dtype, n_jobs, backend)
+        self.memory_budget = memory_budget
+
     def fit(self, X: np.ndarray, y: np.ndarray | None = None) -> bool:
         super().fit(X, y)
         self.data = dict()
 
         for label in self.labels:
-            self.data[label] = self.X[self.y == label]
+            self.data[label] = self.X[self.index[label]]
 
         return True
 
     def score(self, X: np.ndarray, y: object = None) -> np.ndarray:
         super().score(X, y)
-        variances = []
+        X = self._cast(X)
+        variances = self._map_chunks(self._variances, X, y)
 
-        for vec in X:
-            angles = []
-            vectors = self.data[y] - vec
+        # NOTE(sdatko): For convenience, we want outliers to have higher
+        #               numerical values than inliers, but this function
+        #               does the opposite, hence we multiply the result
+        #               by -1 to just invert the axis
+        return -1 * variances
 
-            for vec1, vec2 in combinations(vectors, 2):
-                norm1_squared = vec1.dot(vec1)
-                norm2_squared = vec2.dot(vec2)
+    def _variances(self, X: np.ndarray, y: object = None) -> np.ndarray:
+        '''Calculates the variances of angles in tiles that fit the budget.'''
+        data = self.data[y]
+        variances = np.empty(len(X))
 
-                if norm1_squared == 0 or norm2_squared == 0:
-                    continue
+        # The budget is shared by the workers scoring chunks.
+        tile, block = _angle_tiles(self.memory_budget // self._workers(),
+                                   *data.shape)
 
-                angles.append(vec1.dot(vec2) / norm1_squared / norm2_squared)
+        for start in range(0, len(X), tile):
+            vectors = data - X[start:start + tile, np.newaxis]
+            variances[start:start + tile] = _angle_variances(vectors,
+                                                             weighted=True,
+                                                             block=block)
 
-            variances.append(np.var(angles, axis=0))
+        return variances
 
-        # NOTE(sdatko): For convenience, we want outliers to have higher
-        #               numerical values than inliers, but this function
-        #               does the opposite, hence we multiply the result
-        #               by -1 to just invert the axis
-        return -1 * np.array(variances)
+    def _vector_memory(self, dimension: int, y: object = None) -> int:
+        samples = len(self.data[y])
+        return 8 * samples * (dimension + samples)  # vectors and Gram matrix
 
 
 class AngleBasedOutlierFactor2(BaseModel):
     '''Unweighted angle-based outlier factor distance.'''
 
+    def __init__(self, memory_budget=MEMORY_BUDGET, dtype=None, n_jobs=None,
+                 backend='threads'):
+        super().__init__(dtype, n_jobs, backend)
+        self.memory_budget = memory_budget
+
     def fit(self, X: np.ndarray, y: np.ndarray | None = None) -> bool:
         super().fit(X, y)
         self.data = dict()
 
         for label in self.labels:
-            self.data[label] = self.X[self.y == label]
+            self.data[label] = self.X[self.index[label]]
 
         return True
 
     def score(self, X: np.ndarray, y: object = None) -> np.ndarray:
         super().score(X, y)
-        variances = []
+        X = self._cast(X)
+        variances = self._map_chunks(self._variances, X, y)
 
-        for vec in X:
-            angles = []
-            vectors = self.data[y] - vec
+        # NOTE(sdatko): For convenience, we want outliers to have higher
+        #               numerical values than inliers, but this function
+        #               does the opposite, hence we multiply the result
+        #               by -1 to just invert the axis
+        return -1 * variances
 
-            for vec1, vec2 in combinations(vectors, 2):
-                norm1 = np.sqrt(vec1.dot(vec1))
-                norm2 = np.sqrt(vec2.dot(vec2))
+    def _variances(self, X: np.ndarray, y: object = None) -> np.ndarray:
+        '''Calculates the variances of angles in tiles that fit the budget.'''
+        data = self.data[y]
+        variances = np.empty(len(X))
 
-                if norm1 == 0 or norm2 == 0:
-                    continue
+        # The budget is shared by the workers scoring chunks.
+        tile, block = _angle_tiles(self.memory_budget // self._workers(),
+                                   *data.shape)
 
-                angles.append(vec1.dot(vec2) / norm1 / norm2)
+        for start in range(0, len(X), tile):
+            vectors = data - X[start:start + tile, np.newaxis]
+            variances[start:start + tile] = _angle_variances(vectors,
+                                                             weighted=False,
+                                                             block=block)
 
-            variances.append(np.var(angles, axis=0))
+        return variances
 
-        # NOTE(sdatko): For convenience, we want outliers to have higher
-        #               numerical values than inliers, but this function
-        #               does the opposite, hence we multiply the result
-        #               by -1 to just invert the axis
-        return -1 * np.array(variances)
+    def _vector_memory(self, dimension: int, y: object = None) -> int:
+        samples = len(self.data[y])
+        return 8 * samples * (dimension + samples)  # vectors and Gram matrix
 
 
 class FastAngleBasedOutlierFactor(BaseModel):
-    '''Approximated angle-based outlier factor distance.'''
-
-    def __init__(self, n_neighbors=10):
+    '''Approximated angle-based outlier factor distance.
+
+    The nearest neighbors are found with the given algorithm – 'tree'
+    (KDTree), 'brute' (BruteNeighbors), 'rpforest' (approximate,
+    RandomProjectionForest) or 'auto' (selected by dimension); an index
+    instance with custom parameters can be given as well.
+    '''
+
+    def __init__(self, n_neighbors=10, algorithm='auto',
+                 memory_budget=MEMORY_BUDGET, dtype=None, n_jobs=None,
+                 backend='threads'):
+        super().__init__(dtype, n_jobs, backend)
         self.n_neighbors_base = n_neighbors
+        self.algorithm = algorithm
+        self.memory_budget = memory_budget
 
     def __repr__(self):
         return f'{self.__class__.__name__}({self.n_neighbors_base})'
@@ -96,13 +234,16 @@ class FastAngleBasedOutlierFactor(BaseModel):
     def fit(self, X: np.ndarray, y: np.ndarray | None = None) -> bool:
         super().fit(X, y)
         self.data = dict()
-        self.tree = dict()
         self.n_neighbors = dict()
 
         for label in self.labels:
-            self.data[label] = self.X[self.y == label]
-            self.tree[label] = KDTree(self.X[self.y == label])
+            self.data[label] = self.X[self.index[label]]
+
+        self.tree = self._map_labels(
+            lambda label: build_index(self.data[label], self.algorithm)
+        )
 
+        for label in self.labels:
             self.n_neighbors[label] = self.n_neighbors_base
 
             samples = len(self.data[label])
@@ -113,39 +254,56 @@ class FastAngleBasedOutlierFactor(BaseModel):
 
     def score(self, X: np.ndarray, y: object = None) -> np.ndarray:
         super().score(X, y)
-        variances = []
+        X = self._cast(X)
+        variances = self._map_chunks(self._variances, X, y)
 
-        for vec in X:
-            neighbors = self.tree[y].query((vec, ),
-                                           k=self.n_neighbors[y],
-                                           return_distance=False)[0]
+        # NOTE(sdatko): For convenience, we want outliers to have higher
+        #               numerical values than inliers, but this function
+        #               does the opposite, hence we multiply the result
+        #               by -1 to just invert the axis
+        return -1 * variances
 
-            angles = []
-            vectors = self.data[y][neighbors] - vec
+    def _variances(self, X: np.ndarray, y: object = None) -> np.ndarray:
+        '''Calculates the variances of angles to the nearest neighbors.'''
+        data = self.data[y]
+        variances = np.empty(len(X))
 
-            for vec1, vec2 in combinations(vectors, 2):
-                norm1_squared = vec1.dot(vec1)
-                norm2_squared = vec2.dot(vec2)
+        # The budget is shared by the workers scoring chunks.
+        size = self._vector_memory(data.shape[1], y) * self._workers()
+        tile = max(1, self.memory_budget // size)
 
-                if norm1_squared == 0 or norm2_squared == 0:
-                    continue
+        for start in range(0, len(X), tile):
+            queries = X[start:start + tile]
+            neighbors = self.tree[y].query(queries, k=self.n_neighbors[y],
+                                           return_distance=False)
 
-                angles.append(vec1.dot(vec2) / norm1_squared / norm2_squared)
+            vectors = data[neighbors] - queries[:, np.newaxis]
+            variances[start:start + tile] = _angle_variances(vectors,
+                                                             weighted=True)
 
-            variances.append(np.var(angles, axis=0))
+        return variances
 
-        # NOTE(sdatko): For convenience, we want outliers to have higher
-        #               numerical values than inliers, but this function
-        #               does the opposite, hence we multiply the result
-        #               by -1 to just invert the axis
-        return -1 * np.array(variances)
+    def _vector_memory(self, dimension: int, y: object = None) -> int:
+        samples = self.n_neighbors[y]
+        return 8 * samples * (dimension + samples)  # vectors and Gram matrix
 
 
 class FastAngleBasedOutlierFactor2(BaseModel):
-    '''Unweighted approximated angle-based outlier factor distance.'''
-
-    def __init__(self, n_neighbors=10):
+    '''Unweighted approximated angle-based outlier factor distance.
+
+    The nearest neighbors are found with the given algorithm – 'tree'
+    (KDTree), 'brute' (BruteNeighbors), 'rpforest' (approximate,
+    RandomProjectionForest) or 'auto' (selected by dimension); an index
+    instance with custom parameters can be given as well.
+    '''
+
+    def __init__(self, n_neighbors=10, algorithm='auto',
+                 memory_budget=MEMORY_BUDGET, dtype=None, n_jobs=None,
+                 backend='threads'):
+        super().__init__(dtype, n_jobs, backend)
         self.n_neighbors_base = n_neighbors
+        self.algorithm = algorithm
+        self.memory_budget = memory_budget
 
     def __repr__(self):
         return f'{self.__class__.__name__}({self.n_neighbors_base})'
@@ -153,13 +311,16 @@ class FastAngleBasedOutlierFactor2(BaseModel):
     def fit(self, X: np.ndarray, y: np.ndarray | None = None) -> bool:
         super().fit(X, y)
         self.data = dict()
-        self.tree = dict()
         self.n_neighbors = dict()
 
         for label in self.labels:
-            self.data[label] = self.X[self.y == label]
-            self.tree[label] = KDTree(self.X[self.y == label])
+            self.data[label] = self.X[self.index[label]]
 
+        self.tree = self._map_labels(
+            lambda label: build_index(self.data[label], self.algorithm)
+        )
+
+        for label in self.labels:
             self.n_neighbors[label] = self.n_neighbors_base
 
             samples = len(self.data[label])
@@ -170,29 +331,35 @@ class FastAngleBasedOutlierFactor2(BaseModel):
 
     def score(self, X: np.ndarray, y: object = None) -> np.ndarray:
         super().score(X, y)
-        variances = []
+        X = self._cast(X)
+        variances = self._map_chunks(self._variances, X, y)
 
-        for vec in X:
-            neighbors = self.tree[y].query((vec, ),
-                                           k=self.n_neighbors[y],
-                                           return_distance=False)[0]
+        # NOTE(sdatko): For convenience, we want outliers to have higher
+        #               numerical values than inliers, but this function
+        #               does the opposite, hence we multiply the result
+        #               by -1 to just invert the axis
+        return -1 * variances
 
-            angles = []
-            vectors = self.data[y][neighbors] - vec
+    def _variances(self, X: np.ndarray, y: object = None) -> np.ndarray:
+        '''Calculates the variances of angles to the nearest neighbors.'''
+        data = self.data[y]
+        variances = np.empty(len(X))
 
-            for vec1, vec2 in combinations(vectors, 2):
-                norm1 = np.sqrt(vec1.dot(vec1))
-                norm2 = np.sqrt(vec2.dot(vec2))
+        # The budget is shared by the workers scoring chunks.
+        size = self._vector_memory(data.shape[1], y) * self._workers()
+        tile = max(1, self.memory_budget // size)
 
-                if norm1 == 0 or norm2 == 0:
-                    continue
+        for start in range(0, len(X), tile):
+            queries = X[start:start + tile]
+            neighbors = self.tree[y].query(queries, k=self.n_neighbors[y],
+                                           return_distance=False)
 
-                angles.append(vec1.dot(vec2) / norm1 / norm2)
+            vectors = data[neighbors] - queries[:, np.newaxis]
+            variances[start:start + tile] = _angle_variances(vectors,
+                                                             weighted=False)
 
-            variances.append(np.var(angles, axis=0))
+        return variances
 
-        # NOTE(sdatko): For convenience, we want outliers to have higher
-        #               numerical values than inliers, but this function
-        #               does the opposite, hence we multiply the result
-        #               by -1 to just invert the axis
-        return -1 * np.array(variances)
+    def _vector_memory(self, dimension: int, y: object = None) -> int:
+        samples = self.n_neighbors[y]
+        return 8 * samples * (dimension + samples)  # vectors and Gram matrix
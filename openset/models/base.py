@@ -2,15 +2,164 @@
 
 from abc import ABC
 from abc import abstractmethod
+from collections.abc import Callable
+from collections.abc import Iterable
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import repeat
+from multiprocessing import current_process
+import os
+import pickle
 
 import numpy as np
+from threadpoolctl import threadpool_limits
+
+
+# The default limit (in bytes) for the temporary arrays used while scoring,
+# e.g. for the chunks of data in score_iter().
+MEMORY_BUDGET = 256 * 2**20
+
+# The environment variable limiting the number of threads used by a model (set
+# e.g. by the Runner in the worker processes, so the models running in parallel
+# do not oversubscribe cores).
+THREADS_VARIABLE = 'OPENSET_NUM_THREADS'
+
+# The copy of model held by each worker of the process pool used for scoring,
+# see BaseModel._map_chunks().
+_worker_model = None
+
+
+def group_by_labels(X: np.ndarray, y: np.ndarray | None = None) -> tuple:
+    '''Groups the feature vectors by their labels.
+
+    The vectors are sorted by labels (in a stable order), so the data of each
+    label forms a contiguous slice of the returned array, available later as
+    X[index[label]] without any further scanning and copying.
+
+    Parameters
+    ----------
+    X : np.ndarray
+        The data cluster, represented as a collection of feature vectors.
+    y : np.ndarray | None, optional
+        The labels for feature vectors. If omitted, all elements of X
+        are assigned with same default label and X is not copied.
+
+    Returns
+    -------
+    X, y, labels, index : tuple
+        The grouped vectors and labels, the array of unique labels and the
+        dictionary mapping each label to the slice of its vectors.
+    '''
+    if y is None:
+        y = np.full((X.shape[0]), None)
+        labels = np.array([None])
+        index = {None: slice(0, X.shape[0])}
+
+        return X, y, labels, index
+
+    if X.shape[0] != y.shape[0]:
+        raise ValueError('X and y must have the same first dimension')
+
+    order = np.argsort(y, kind='stable')
+    X = X[order]
+    y = y[order]
+
+    labels, starts, counts = np.unique(y, return_index=True,
+                                       return_counts=True)
+    index = {label: slice(start, start + count)
+             for label, start, count in zip(labels, starts, counts)}
+
+    return X, y, labels, index
+
+
+def _set_worker_model(model: 'BaseModel') -> None:
+    '''Initializes the worker process with a copy of the model.'''
+    global _worker_model
+    _worker_model = model
+    threadpool_limits(limits=1)
+
+
+def _call_worker_model(method: str, *args) -> np.ndarray:
+    '''Calls the method of the model copy held by the worker process.'''
+    return getattr(_worker_model, method)(*args)
+
+
+class _ArrayPickler(pickle.Pickler):
+    '''Pickler storing the numerical arrays outside of the pickled data.
+
+    Each array is passed once (with its consecutive number) to the store
+    function, which saves it somewhere and returns the name to refer to it.
+    '''
+
+    def __init__(self, file, store: Callable):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.store = store
+        self.names = dict()  # the arrays shared by attributes are kept once
+
+    def persistent_id(self, obj: object) -> str | None:
+        if not isinstance(obj, np.ndarray) or obj.dtype.hasobject:
+            return None
+
+        if id(obj) not in self.names:
+            name = self.store(obj, len(self.names))
+            self.names[id(obj)] = (name, obj)  # the obj must stay alive
+
+        return self.names[id(obj)][0]
+
+
+class _ArrayUnpickler(pickle.Unpickler):
+    '''Unpickler restoring the arrays stored by _ArrayPickler.
+
+    The load function returns the array of given name, each called once.
+    '''
+
+    def __init__(self, file, load: Callable):
+        super().__init__(file)
+        self.load_array = load
+        self.arrays = dict()
+
+    def persistent_load(self, pid: str) -> np.ndarray:
+        if pid not in self.arrays:
+            self.arrays[pid] = self.load_array(pid)
+
+        return self.arrays[pid]
 
 
 class BaseModel(ABC):
-    '''Abstract class for a distance/similarity model.'''
+    '''Abstract class for a distance/similarity model.
 
-    def __init__(self):
-        pass
+    The optional dtype (e.g. np.float32) specifies the data type of training
+    data and of the model parameters, as well as of the data being scored,
+    to reduce the memory usage and speed up the computations. Whenever needed
+    for stability, the intermediate values are still calculated in float64.
+    By default (None), the data type of given arrays is preserved.
+
+    The optional n_jobs specifies the number of threads used to process
+    the labels concurrently, where applicable (e.g. to build the neighbors
+    structures of labels in fit()); -1 means all the available CPU cores.
+    By default (None), the labels are processed one after another.
+    The models that score each vector independently and at a high cost
+    also use n_jobs to score the chunks of data concurrently. The backend
+    specifies whether the chunks are processed in a pool of threads
+    ('threads', the default) or processes ('processes', for the code
+    that holds the GIL; the model is sent once to each worker process).
+    The number of threads is capped by the OPENSET_NUM_THREADS environment
+    variable, if it is set (e.g. by the Runner in its worker processes).
+    '''
+
+    dtype = None
+    n_jobs = None
+    backend = 'threads'
+
+    def __init__(self, dtype=None, n_jobs=None, backend='threads'):
+        if backend not in ('threads', 'processes'):
+            raise ValueError(f'Unknown backend: {backend}')
+
+        self.dtype = dtype
+        self.n_jobs = n_jobs
+        self.backend = backend
 
     def __repr__(self):
         return f'{self.__class__.__name__}'
@@ -39,6 +188,10 @@ class BaseModel(ABC):
             The labels for feature vectors, given as an array of shape (N, 1).
             If omitted, all elements of X are assigned with same default label.
 
+            The training vectors are stored grouped by labels (in a stable
+            order), the slice of self.X holding the vectors of given label
+            is kept in self.index[label]. If y is omitted, X is not copied.
+
         Returns
         -------
         result : bool
@@ -48,15 +201,8 @@ class BaseModel(ABC):
         --------
         N/A
         '''
-        self.X = X.copy()
-        if y is None:
-            self.y = np.full((self.X.shape[0]), None)
-        else:
-            self.y = y.copy()
-        if self.X.shape[0] != self.y.shape[0]:
-            raise ValueError('X and y must have the same first dimension')
-
-        self.labels = np.unique(y)
+        self.X, self.y, self.labels, self.index = group_by_labels(X, y)
+        self.X = self._cast(self.X)
 
         pass  # The model-specific implementation should come here
 
@@ -90,3 +236,219 @@ class BaseModel(ABC):
             raise ValueError(f'Given category y={y} is not known')
 
         pass  # The model-specific implementation should come here
+
+    def score_all(self, X: np.ndarray) -> np.ndarray:
+        '''Calculates the distance/similarity with respect to all known labels.
+
+        The default implementation simply calls the score() method for each
+        label, the models may override it to share the work between labels.
+
+        Parameters
+        ----------
+        X : np.ndarray
+            The data cluster, represented as a collection of feature vectors.
+            The array shape (N, D) corresponds to N samples of dimension D.
+
+        Returns
+        -------
+        distances : np.ndarray
+            The calculated distance values of a given data cluster, as an array
+            of shape (N, L), where the column j corresponds to the label stored
+            as self.labels[j] (e.g. the argmin over axis 1 gives the indices of
+            the closest labels for all vectors).
+
+        Examples
+        --------
+        N/A
+        '''
+        distances = np.empty((X.shape[0], len(self.labels)))
+
+        for column, label in enumerate(self.labels):
+            distances[:, column] = self.score(X, label)
+
+        return distances
+
+    def score_iter(self,
+                   X: np.ndarray | Iterable[np.ndarray],
+                   y: object = None,
+                   memory_budget: int = MEMORY_BUDGET) -> Iterator[np.ndarray]:
+        '''Calculates the distance/similarity of data in chunks.
+
+        This method allows to score the data that does not fit in memory,
+        e.g. a large np.memmap array or a stream of batches of vectors read
+        from multiple files. The data are split into chunks, so the memory
+        needed to score each of them is within the given budget.
+
+        Parameters
+        ----------
+        X : np.ndarray | Iterable[np.ndarray]
+            The data cluster, represented as a collection of feature vectors,
+            or an iterable of such collections (batches).
+        y : object, optional
+            The label of training data to compare with given feature vectors X.
+            If omitted, the default label is assumed.
+        memory_budget : int, optional
+            The approximate limit (in bytes) for the memory used to score
+            a single chunk (default: 256 MiB).
+
+        Yields
+        ------
+        distances : np.ndarray
+            The calculated distance values for consecutive chunks of the data,
+            as returned by the score() method.
+
+        Examples
+        --------
+        N/A
+        '''
+        batches = (X, ) if isinstance(X, np.ndarray) else X
+
+        for batch in batches:
+            batch = np.asarray(batch)
+            size = memory_budget // self._vector_memory(batch.shape[1], y)
+            size = max(1, size)
+
+            for start in range(0, batch.shape[0], size):
+                yield self.score(batch[start:start + size], y)
+
+    def save(self, path: str | os.PathLike) -> None:
+        '''Stores the prepared model in a given directory.
+
+        The numerical arrays of model (e.g. the training data, the matrices
+        of each label or the arrays of neighbors trees) are written as separate
+        .npy files in the arrays subdirectory, while the rest of model state
+        is pickled to the model.pkl file, referring to these arrays by name.
+        The arrays shared between labels are stored only once.
+
+        Parameters
+        ----------
+        path : str | os.PathLike
+            The directory to store the model in (created, if not existing).
+
+        Examples
+        --------
+        N/A
+        '''
+        directory = os.path.join(path, 'arrays')
+        os.makedirs(directory, exist_ok=True)
+
+        def store(array: np.ndarray, number: int) -> str:
+            name = f'{number}.npy'
+            np.save(os.path.join(directory, name), array)
+            return name
+
+        with open(os.path.join(path, 'model.pkl'), 'wb') as file:
+            _ArrayPickler(file, store).dump(self)
+
+    @classmethod
+    def load(cls, path: str | os.PathLike, mmap: bool = True) -> 'BaseModel':
+        '''Restores the model stored with the save() method.
+
+        By default, the arrays are loaded lazily as read-only memory-mapped
+        files, so loading is fast and the memory pages are shared by all the
+        processes using the same stored model.
+
+        Parameters
+        ----------
+        path : str | os.PathLike
+            The directory with the stored model.
+        mmap : bool, optional
+            Whether to memory-map the arrays instead of reading them
+            into memory (default: True).
+
+        Returns
+        -------
+        model : BaseModel
+            The restored model, ready for scoring.
+
+        Examples
+        --------
+        N/A
+        '''
+        directory = os.path.join(path, 'arrays')
+        mmap_mode = 'r' if mmap else None
+
+        def load(name: str) -> np.ndarray:
+            return np.load(os.path.join(directory, name), mmap_mode=mmap_mode)
+
+        with open(os.path.join(path, 'model.pkl'), 'rb') as file:
+            model = _ArrayUnpickler(file, load).load()
+
+        if not isinstance(model, cls):
+            raise TypeError(f'Stored model is not a {cls.__name__}')
+
+        return model
+
+    def _cast(self, X: np.ndarray) -> np.ndarray:
+        '''Converts the data to the dtype of model, if it is specified.'''
+        if self.dtype is None:
+            return X
+
+        return np.asarray(X, dtype=self.dtype)
+
+    def _map_labels(self, function: Callable) -> dict:
+        '''Calls the function for each label, concurrently if n_jobs is set.
+
+        The work is done in a pool of threads, as the heavy computations
+        (e.g. in NumPy, SciPy or scikit-learn) usually release the GIL.
+        The results are collected in the order of labels, so they are always
+        the same as in case of the serial processing.
+        '''
+        workers = self._workers()
+
+        if workers <= 1 or len(self.labels) <= 1:
+            return {label: function(label) for label in self.labels}
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return dict(zip(self.labels,
+                            executor.map(function, self.labels)))
+
+    def _map_chunks(self, function: Callable, X: np.ndarray,
+                    *args) -> np.ndarray:
+        '''Calls the function for chunks of X, concurrently if n_jobs is set.
+
+        The data are split into (at most) one chunk per worker and the results
+        are concatenated in the order of chunks. Inside the workers, the BLAS
+        libraries are limited to a single thread, to not oversubscribe cores.
+        With the 'processes' backend, the function must be a method of model,
+        which is called by name on the copy of model held by each worker.
+        In a daemonic process (e.g. a worker of the Runner), that cannot have
+        children, the chunks are processed in a pool of threads instead.
+        '''
+        workers = min(self._workers(), X.shape[0])
+
+        if workers <= 1:
+            return function(X, *args)
+
+        chunks = np.array_split(X, workers)
+        arguments = [repeat(argument) for argument in args]
+
+        if self.backend == 'processes' and not current_process().daemon:
+            executor = ProcessPoolExecutor(max_workers=workers,
+                                           initializer=_set_worker_model,
+                                           initargs=(self, ))
+            function = partial(_call_worker_model, function.__name__)
+        else:
+            executor = ThreadPoolExecutor(max_workers=workers)
+
+        with executor, threadpool_limits(limits=1):
+            return np.concatenate(list(executor.map(function, chunks,
+                                                    *arguments)))
+
+    def _workers(self) -> int:
+        '''Returns the number of threads to use, as specified by n_jobs.'''
+        if self.n_jobs is None:
+            workers = 1
+        elif self.n_jobs < 0:
+            workers = os.cpu_count() or 1
+        else:
+            workers = self.n_jobs
+
+        if os.environ.get(THREADS_VARIABLE):
+            workers = min(workers, int(os.environ[THREADS_VARIABLE]))
+
+        return max(1, workers)
+
+    def _vector_memory(self, dimension: int, y: object = None) -> int:
+        '''Estimates the memory (in bytes) needed to score a single vector.'''
+        return 4 * 8 * dimension  # the vector and a few temporary copies
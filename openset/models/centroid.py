@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+
+import numpy as np
+from scipy.spatial.distance import cdist
+
+from ..models.moments import MomentsModel
+
+
+class CentroidModel(MomentsModel):
+    '''Abstract class for a distance measured to the cluster centroid.
+
+    The subclasses shall set the `metric` attribute to the name of a distance
+    function supported by scipy.spatial.distance.cdist() and, if the metric
+    requires any additional parameters, provide them with `_metric_kwargs()`.
+
+    The whole data cluster is scored with a single cdist() call, instead of
+    calling the distance function in Python for each vector separately.
+    Similarly, score_all() compares the data with all the centroids at once,
+    unless the metric parameters depend on the label.
+    '''
+
+    metric = None
+
+    def score(self, X: np.ndarray, y: object = None) -> np.ndarray:
+        super().score(X, y)
+        X = self._cast(X)
+
+        centroid = self.means[y][np.newaxis, :]
+        distances = cdist(X, centroid, self.metric,
+                          **self._metric_kwargs(y))[:, 0]
+
+        return distances
+
+    def score_all(self, X: np.ndarray) -> np.ndarray:
+        X = self._cast(X)
+        centroids = np.stack([self.means[label] for label in self.labels])
+        distances = cdist(X, centroids, self.metric, **self._metric_kwargs())
+
+        return distances
+
+    def _fit_moments(self) -> None:
+        self.means = dict()
+
+        for label in self.labels:
+            self.means[label] = self._cast(self.moments[label].mean)
+
+    def _metric_kwargs(self, y: object = None) -> dict:
+        '''Returns the additional parameters of metric for the given label.'''
+        return dict()
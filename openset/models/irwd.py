@@ -13,7 +13,9 @@ class IntegratedRankWeightedDepth(BaseModel):
 
     n_proj = number of random direction vectors,
     U = random directions on hypersphere, shape (self.d x self.n_proj),
-    M = dot products between training set vectors and U, shape (n x n_proj).
+    M = dot products between training set vectors and U, shape (n x n_proj),
+        with each column sorted (the order of training vectors is irrelevant
+        for the depth and sorting allows to find the ranks by bisection).
 
     Element M[i,j] = <X_i, U_j>, dot product of X_i and U_j, where:
     – X_i = i-th row of X,
@@ -22,7 +24,9 @@ class IntegratedRankWeightedDepth(BaseModel):
     Formula D_IRW(x, Sn) taken from page 5 of the NIPS paper.
     '''
 
-    def __init__(self, n_proj=1000):
+    def __init__(self, n_proj=1000, dtype=None, n_jobs=None,
+                 backend='threads'):
+        super().__init__(dtype, n_jobs, backend)
         self.n_proj = n_proj
 
     def __repr__(self):
@@ -33,38 +37,81 @@ class IntegratedRankWeightedDepth(BaseModel):
         self.U = dict()
         self.M = dict()
 
-        for label in self.labels:
-            dimension = self.X[self.y == label].shape[1]
+        # The directions depend only on the dimension, hence they are drawn
+        # once and shared by all the labels. The standard normal samples are
+        # exactly what the multivariate normal sampler with identity covariance
+        # would return, but without the costly SVD of it.
+        dimension = self.X.shape[1]
 
-            mu = np.zeros(dimension)
-            cov = np.identity(dimension)
+        rng = np.random.default_rng(42)
+        U = rng.standard_normal((self.n_proj, dimension)).T
+        U /= np.linalg.norm(U, axis=0)  # normalized
+        U = self._cast(U)
 
-            rng = np.random.default_rng(42)
-            U = rng.multivariate_normal(mu, cov, self.n_proj).T
+        M = np.dot(self.X, U)  # projections of all labels at once
 
-            self.U[label] = U / np.linalg.norm(U, axis=0)  # normalized
-            self.M[label] = np.dot(self.X[self.y == label], self.U[label])
+        for label in self.labels:
+            self.U[label] = U
+            self.M[label] = np.asfortranarray(np.sort(M[self.index[label]],
+                                                      axis=0))
 
         return True
 
     def score(self, X: np.ndarray, y: object = None) -> np.ndarray:
         super().score(X, y)
-
-        def D_IRW(vec):
-            v = np.dot(vec, self.U[y])
-            M_v = self.M[y] - v
-
-            training_samples = M_v.shape[0]
-
-            D_IRW = sum(min((column <= 0).sum(), (column > 0).sum())
-                        for column in M_v.T) / training_samples / self.n_proj
-
-            return D_IRW
-
-        distances = np.array([D_IRW(vec) for vec in X])
+        X = self._cast(X)
+        distances = self._map_chunks(self._label_depths, X, y)
 
         # NOTE(sdatko): For convenience, we want outliers to have higher
         #               numerical values than inliers, but this function
         #               does the opposite, hence we multiply the result
         #               by -1 to just invert the axis
         return -1 * distances
+
+    def score_all(self, X: np.ndarray) -> np.ndarray:
+        X = self._cast(X)
+        distances = self._map_chunks(self._all_depths, X)
+
+        # See the note about the sign in the score() method
+        return -1 * distances
+
+    def _label_depths(self, X: np.ndarray, y: object = None) -> np.ndarray:
+        '''Calculates the depths of vectors with respect to a given label.'''
+        return self._depths(np.dot(X, self.U[y]), self.M[y])
+
+    def _all_depths(self, X: np.ndarray) -> np.ndarray:
+        '''Calculates the depths of vectors with respect to all labels.'''
+        distances = np.empty((X.shape[0], len(self.labels)))
+        projections = dict()  # the directions are usually shared by labels
+
+        for column, label in enumerate(self.labels):
+            U = self.U[label]
+            if id(U) not in projections:
+                projections[id(U)] = np.dot(X, U)
+
+            distances[:, column] = self._depths(projections[id(U)],
+                                                self.M[label])
+
+        return distances
+
+    def _depths(self, projections: np.ndarray, M: np.ndarray) -> np.ndarray:
+        '''Calculates the depths of vectors given by their projections on U.'''
+        training_samples = M.shape[0]
+
+        # The columns of M are sorted, so for each projection the number of
+        # training vectors lying on the negative side of the hyperplane (i.e.
+        # <X_i, U_j> <= <v, U_j>) is the position of a query vector found by
+        # bisection, calculated at once for all vectors of X.
+        ranks = np.empty(projections.shape, dtype=np.intp)
+
+        for j, column in enumerate(M.T):
+            ranks[:, j] = np.searchsorted(column, projections[:, j],
+                                          side='right')
+
+        depths = np.minimum(ranks, training_samples - ranks).sum(axis=1) \
+            / training_samples / self.n_proj
+
+        return depths
+
+    def _vector_memory(self, dimension: int, y: object = None) -> int:
+        return 8 * (dimension + 2 * self.n_proj)  # vector, projections, ranks
@@ -4,36 +4,113 @@ import numpy as np
 from sklearn.neighbors import KNeighborsTransformer as scikit_kNN
 
 from ..models.base import BaseModel
+from ..models.neighbors import build_index
+from ..models.neighbors import resolve_algorithm
+
+
+def _neighbors_range(n_neighbors: object, maximum: int) -> np.ndarray:
+    '''Validates the numbers of neighbors requested for multi-k scoring.'''
+    if n_neighbors is None:
+        return np.arange(1, maximum + 1)
+
+    n_neighbors = np.atleast_1d(np.asarray(n_neighbors, dtype=np.intp))
+
+    if n_neighbors.ndim != 1 or n_neighbors.size == 0:
+        raise ValueError('n_neighbors must be a non-empty sequence')
+    if n_neighbors.min() < 1 or n_neighbors.max() > maximum:
+        raise ValueError(f'n_neighbors must be between 1 and {maximum}')
+
+    return n_neighbors
 
 
 class KNearestNeighbors(BaseModel):
-    '''K nearest neighbors distance.'''
+    '''K nearest neighbors distance.
+
+    The nearest neighbors are found with the given algorithm – 'tree'
+    (the scikit-learn model), 'brute' (BruteNeighbors), 'rpforest'
+    (approximate, RandomProjectionForest) or 'auto' (selected by dimension);
+    an index instance with custom parameters can be given as well.
+    '''
 
-    def __init__(self, n_neighbors=10):
+    def __init__(self, n_neighbors=10, algorithm='auto', dtype=None,
+                 n_jobs=None):
+        super().__init__(dtype, n_jobs)
         self.n_neighbors = n_neighbors
+        self.algorithm = algorithm
 
     def __repr__(self):
         return f'{self.__class__.__name__}({self.n_neighbors})'
 
     def fit(self, X: np.ndarray, y: np.ndarray | None = None) -> bool:
         super().fit(X, y)
-        self.classifiers = dict()
-
-        for label in self.labels:
-            n_neighbors = self.n_neighbors
-
-            samples = len(self.X[self.y == label])
-            if samples < n_neighbors:
-                n_neighbors = samples
-
-            self.classifiers[label] = scikit_kNN(n_neighbors=n_neighbors)
-            self.classifiers[label].fit(self.X[self.y == label])
+        self.classifiers = self._map_labels(self._fit_label)
 
         return True
 
     def score(self, X: np.ndarray, y: object = None) -> np.ndarray:
         super().score(X, y)
+        X = self._cast(X)
 
         distances, _ = self.classifiers[y].kneighbors(X)
 
         return distances.mean(axis=1)
+
+    def score_neighbors(self, X: np.ndarray, y: object = None,
+                        n_neighbors: object = None) -> np.ndarray:
+        '''Calculates the distance for multiple numbers of neighbors at once.
+
+        A single query for the nearest neighbors (as many as the model was
+        prepared for) is made and the distances for each smaller number k
+        of neighbors come from the cumulative sums of sorted distances.
+
+        Parameters
+        ----------
+        X : np.ndarray
+            The data cluster, represented as a collection of feature vectors.
+            The array shape (N, D) corresponds to N samples of dimension D.
+        y : object, optional
+            The label of training data to compare with given feature vectors X.
+            If omitted, the default label is assumed.
+        n_neighbors : Iterable[int], optional
+            The K numbers of neighbors to use, each not greater than the
+            number the model was prepared for. If omitted, all the numbers
+            from 1 to n_neighbors are used.
+
+        Returns
+        -------
+        distances : np.ndarray
+            The calculated distance values, as an array of shape (N, K),
+            where the column j corresponds to n_neighbors[j] neighbors.
+
+        Examples
+        --------
+        N/A
+        '''
+        super().score(X, y)
+        X = self._cast(X)
+        n_neighbors = _neighbors_range(n_neighbors, self.n_neighbors)
+
+        distances, _ = self.classifiers[y].kneighbors(X)
+        sums = np.cumsum(distances, axis=1)
+
+        # The labels with fewer vectors use all of them.
+        n_neighbors = np.minimum(n_neighbors, distances.shape[1])
+
+        return sums[:, n_neighbors - 1] / n_neighbors
+
+    def _fit_label(self, label: object) -> object:
+        '''Builds the nearest neighbors model of a given label.'''
+        data = self.X[self.index[label]]
+        n_neighbors = self.n_neighbors
+
+        samples = len(data)
+        if samples < n_neighbors:
+            n_neighbors = samples
+
+        if resolve_algorithm(self.algorithm, data.shape[1]) == 'tree':
+            classifier = scikit_kNN(n_neighbors=n_neighbors)
+            classifier.fit(data)
+        else:
+            classifier = build_index(data, self.algorithm, n_neighbors)
+
+        return classifier
@@ -4,40 +4,162 @@ import numpy as np
 from sklearn.neighbors import LocalOutlierFactor as scikit_lof
 
 from ..models.base import BaseModel
+from ..models.knn import _neighbors_range
+from ..models.neighbors import build_index
+from ..models.neighbors import resolve_algorithm
 
 
 class LocalOutlierFactor(BaseModel):
-    '''Local outlier factor distance.'''
+    '''Local outlier factor distance.
 
-    def __init__(self, n_neighbors=10):
+    The nearest neighbors are found with the given algorithm – 'tree'
+    (the scikit-learn model), 'brute' (BruteNeighbors), 'rpforest'
+    (approximate, RandomProjectionForest) or 'auto' (selected by dimension);
+    an index instance with custom parameters can be given as well.
+    Unless the scikit-learn model is used, the factors are calculated here,
+    in the same way as in it.
+    '''
+
+    def __init__(self, n_neighbors=10, algorithm='auto', dtype=None,
+                 n_jobs=None):
+        super().__init__(dtype, n_jobs)
         self.n_neighbors = n_neighbors
+        self.algorithm = algorithm
 
     def __repr__(self):
         return f'{self.__class__.__name__}({self.n_neighbors})'
 
     def fit(self, X: np.ndarray, y: np.ndarray | None = None) -> bool:
         super().fit(X, y)
-        self.classifiers = dict()
-
-        for label in self.labels:
-            n_neighbors = self.n_neighbors
-
-            samples = len(self.X[self.y == label])
-            if samples < n_neighbors:
-                n_neighbors = samples
-
-            self.classifiers[label] = scikit_lof(n_neighbors=n_neighbors,
-                                                 novelty=True)
-            self.classifiers[label].fit(self.X[self.y == label])
+        self.classifiers = self._map_labels(self._fit_label)
+        self.graphs = dict()
+        self.densities = dict()
 
         return True
 
     def score(self, X: np.ndarray, y: object = None) -> np.ndarray:
         super().score(X, y)
+        X = self._cast(X)
 
         # NOTE(sdatko): This function returns negative numbers, assuming
         #               bigger values (i.e. closer to 0 [zero]) as inliers.
         #               The opposite of it can be used as a distance measure.
-        distances = -1 * self.classifiers[y].score_samples(X)
+        classifier = self.classifiers[y]
+
+        if isinstance(classifier, scikit_lof):
+            distances = -1 * classifier.score_samples(X)
+        else:
+            distances = self.score_neighbors(X, y, [self.n_neighbors])[:, 0]
 
         return distances
+
+    def score_neighbors(self, X: np.ndarray, y: object = None,
+                        n_neighbors: object = None) -> np.ndarray:
+        '''Calculates the distance for multiple numbers of neighbors at once.
+
+        A single query for the nearest neighbors (as many as the model was
+        prepared for) is made and the factors for each smaller number k
+        of neighbors are derived from the first k of them, together with
+        the local reachability densities of training vectors for k neighbors,
+        obtained (once per label and k) from the stored neighbors graph.
+
+        Parameters
+        ----------
+        X : np.ndarray
+            The data cluster, represented as a collection of feature vectors.
+            The array shape (N, D) corresponds to N samples of dimension D.
+        y : object, optional
+            The label of training data to compare with given feature vectors X.
+            If omitted, the default label is assumed.
+        n_neighbors : Iterable[int], optional
+            The K numbers of neighbors to use, each not greater than the
+            number the model was prepared for. If omitted, all the numbers
+            from 1 to n_neighbors are used.
+
+        Returns
+        -------
+        distances : np.ndarray
+            The calculated distance values, as an array of shape (N, K),
+            where the column j corresponds to n_neighbors[j] neighbors.
+
+        Examples
+        --------
+        N/A
+        '''
+        super().score(X, y)
+        X = self._cast(X)
+        n_neighbors = _neighbors_range(n_neighbors, self.n_neighbors)
+
+        maximum = self._max_neighbors(y)
+        distances, neighbors = self.classifiers[y].kneighbors(
+            X, n_neighbors=maximum
+        )
+        factors = np.empty((X.shape[0], len(n_neighbors)))
+
+        # The labels with fewer vectors use all of them.
+        n_neighbors = np.minimum(n_neighbors, maximum)
+
+        for column, k in enumerate(n_neighbors):
+            k_distances, densities = self._densities(y, k)
+            reach = np.maximum(distances[:, :k], k_distances[neighbors[:, :k]])
+            query_densities = 1 / (reach.mean(axis=1) + 1e-10)
+
+            ratios = densities[neighbors[:, :k]] \
+                / query_densities[:, np.newaxis]
+            factors[:, column] = ratios.mean(axis=1)
+
+        return factors
+
+    def _densities(self, label: object, k: int) -> tuple:
+        '''Returns the k-distances and reachability densities for label.
+
+        Both are calculated as in the scikit-learn model fitted for k
+        neighbors, but from the first k columns of the neighbors graph
+        of training data (queried once per label for all the k values).
+        '''
+        if label not in self.graphs:
+            self.graphs[label] = self.classifiers[label].kneighbors(
+                n_neighbors=self._max_neighbors(label)
+            )
+
+        if (label, k) not in self.densities:
+            distances, neighbors = self.graphs[label]
+            distances = distances[:, :k]
+            neighbors = neighbors[:, :k]
+
+            k_distances = distances[:, -1]
+            reach = np.maximum(distances, k_distances[neighbors])
+            densities = 1 / (reach.mean(axis=1) + 1e-10)
+
+            self.densities[label, k] = (k_distances, densities)
+
+        return self.densities[label, k]
+
+    def _fit_label(self, label: object) -> object:
+        '''Builds the local outlier factor model of a given label.'''
+        data = self.X[self.index[label]]
+        n_neighbors = self.n_neighbors
+
+        samples = len(data)
+        if samples < n_neighbors:
+            n_neighbors = samples
+
+        if resolve_algorithm(self.algorithm, data.shape[1]) == 'tree':
+            classifier = scikit_lof(n_neighbors=n_neighbors, novelty=True)
+            classifier.fit(data)
+        else:
+            # The vectors are not their own neighbors in the training graph, as
+            # in the scikit-learn model.
+            n_neighbors = max(1, min(n_neighbors, samples - 1))
+            classifier = build_index(data, self.algorithm, n_neighbors)
+
+        return classifier
+
+    def _max_neighbors(self, label: object) -> int:
+        '''Returns the number of neighbors used for a given label.'''
+        classifier = self.classifiers[label]
+
+        if isinstance(classifier, scikit_lof):
+            return classifier.n_neighbors_
+
+        return classifier.n_neighbors
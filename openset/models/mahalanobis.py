@@ -1,64 +1,250 @@
 #!/usr/bin/env python3
 
 import numpy as np
-from scipy.spatial.distance import mahalanobis
+from scipy.linalg import cho_solve
+from scipy.linalg import cholesky
+from scipy.linalg import eigh
+from scipy.linalg import LinAlgError
+from scipy.linalg import solve_triangular
+from scipy.spatial.distance import cdist
 
 from ..models.base import BaseModel
+from ..models.moments import Moments
+from ..models.moments import MomentsModel
 
 
-class Mahalanobis(BaseModel):
-    '''Mahalanobis distance.'''
+def _factorize(cov: np.ndarray) -> np.ndarray:
+    '''Returns the factor of a covariance matrix, as used by _whiten().
 
-    def fit(self, X: np.ndarray, y: np.ndarray | None = None) -> bool:
-        super().fit(X, y)
-        self.means = dict()
-        self.icovs = dict()
+    That is the lower-triangular Cholesky factor L of cov = L L^T or, if cov
+    is singular (e.g. for fewer samples than dimensions), the rectangular
+    whitening matrix W = S^-1/2 V^T, of the positive eigenvalues S and their
+    eigenvectors V, so the distances come from the pseudo-inverse of cov
+    (as W^T W), instead of failing.
+    '''
+    if not cov.shape:  # hack for 1-dimensional data
+        cov.shape = (1, 1)
 
-        for label in self.labels:
-            data = self.X[self.y == label]
-            cov = np.cov(data.T)
+    try:
+        return cholesky(cov, lower=True, check_finite=False)
+    except LinAlgError:
+        values, vectors = eigh(cov, check_finite=False)
 
-            if not cov.shape:  # hack for 1-dimensional data
-                cov.shape = (1, 1)
+    tolerance = max(values.max(initial=0), 0) * cov.shape[0] \
+        * np.finfo(values.dtype).eps * 10
+    positive = values > tolerance
 
-            self.means[label] = data.mean(axis=0)
-            self.icovs[label] = np.linalg.inv(cov)
+    if positive.all():  # not positive definite only due to rounding errors
+        root = vectors * np.sqrt(values)  # cov = root root^T = R^T R
+        return np.linalg.qr(root.T, mode='r').T
+
+    return (vectors[:, positive] / np.sqrt(values[positive])).T
+
+
+def _whiten(factor: np.ndarray, X: np.ndarray) -> np.ndarray:
+    '''Transforms the columns of X with the factor of covariance matrix.
+
+    That is z = L^-1 X for the Cholesky factor L (with a triangular solve),
+    or z = W X for the whitening matrix W; see _factorize().
+    '''
+    if factor.shape[0] != factor.shape[1]:  # the whitening matrix
+        return np.dot(factor, X)
+
+    return solve_triangular(factor, X, lower=True, check_finite=False)
+
+
+def _invert(chol: np.ndarray) -> np.ndarray:
+    '''Returns the inverse of a covariance matrix from its factor.'''
+    if chol.shape[0] != chol.shape[1]:  # the pseudo-inverse
+        return np.dot(chol.T, chol)
+
+    identity = np.identity(chol.shape[0], dtype=chol.dtype)
+
+    return cho_solve((chol, True), identity, check_finite=False)
 
-        return True
+
+def _mahalanobis(X: np.ndarray, mean: np.ndarray,
+                 chol: np.ndarray) -> np.ndarray:
+    '''Calculates the Mahalanobis distances of all vectors of X at once.
+
+    With the covariance matrix factorized as cov = L L^T, the squared distance
+    (x - mean)^T cov^-1 (x - mean) equals to the squared norm of z = L^-1 (x -
+    mean), hence the whole batch costs a single triangular solve.
+    '''
+    diff = (np.asarray(X, dtype=chol.dtype) - mean).T
+    z = _whiten(chol, diff)
+
+    return np.sqrt(np.einsum('ij,ij->j', z, z))
+
+
+class Mahalanobis(MomentsModel):
+    '''Mahalanobis distance.
+
+    The covariance matrices are stored as their Cholesky factors, cast to
+    the dtype of model (if given) after the factorization in float64.
+    The singular matrices (e.g. of labels with fewer samples than dimensions)
+    are replaced with their pseudo-inverses, see _factorize().
+    '''
+
+    scatter = True
+
+    def _fit_moments(self) -> None:
+        self.means = dict()
+
+        for label in self.labels:
+            self.means[label] = self._cast(self.moments[label].mean)
+
+        self.chols = self._map_labels(
+            lambda label: self._cast(_factorize(self.moments[label].cov))
+        )
 
     def score(self, X: np.ndarray, y: object = None) -> np.ndarray:
         super().score(X, y)
+        X = self._cast(X)
 
-        distances = np.array([mahalanobis(vec, self.means[y], self.icovs[y])
-                              for vec in X])
+        distances = _mahalanobis(X, self.means[y], self.chols[y])
 
         return distances
 
+    @property
+    def icovs(self) -> dict:
+        '''Inverse covariance matrices, recovered from their factors.'''
+        return {label: _invert(chol) for label, chol in self.chols.items()}
 
-class MahalanobisSC(BaseModel):
-    '''Mahalanobis distance with shared covariance matrix.'''
 
-    def fit(self, X: np.ndarray, y: np.ndarray | None = None) -> bool:
-        super().fit(X, y)
-        self.means = dict()
-        self.icov = None
+class MahalanobisSC(MomentsModel):
+    '''Mahalanobis distance with shared covariance matrix.
+
+    The covariance matrix is stored as its Cholesky factor, cast to
+    the dtype of model (if given) after the factorization in float64.
+    The singular matrix is replaced with its pseudo-inverse, see _factorize().
+    '''
 
-        cov = np.cov(self.X.T)
+    scatter = True
 
-        if not cov.shape:  # hack for 1-dimensional data
-            cov.shape = (1, 1)
+    def _fit_moments(self) -> None:
+        self.means = dict()
+        self.chol = None
 
-        self.icov = np.linalg.inv(cov)
+        dimension = self.moments[self.labels[0]].mean.shape[0]
+        total = Moments(dimension, scatter=True)  # of all the labels
 
         for label in self.labels:
-            self.means[label] = self.X[self.y == label].mean(axis=0)
+            total.merge(self.moments[label])
+            self.means[label] = self._cast(self.moments[label].mean)
 
-        return True
+        self.chol = self._cast(_factorize(total.cov))
 
     def score(self, X: np.ndarray, y: object = None) -> np.ndarray:
         super().score(X, y)
+        X = self._cast(X)
+
+        distances = _mahalanobis(X, self.means[y], self.chol)
+
+        return distances
 
-        distances = np.array([mahalanobis(vec, self.means[y], self.icov)
-                              for vec in X])
+    def score_all(self, X: np.ndarray) -> np.ndarray:
+        # With the shared covariance, the distances are just the Euclidean
+        # distances in the whitened space, so the data and all means are
+        # transformed only once.
+        means = np.stack([self.means[label] for label in self.labels])
+
+        X = np.asarray(X, dtype=self.chol.dtype)
+        z_X = _whiten(self.chol, X.T)
+        z_means = _whiten(self.chol, means.T)
+
+        distances = cdist(z_X.T, z_means.T)
 
         return distances
+
+    @property
+    def icov(self) -> np.ndarray:
+        '''Inverse covariance matrix, recovered from its factor.'''
+        return _invert(self.chol)
+
+
+class MahalanobisLowRank(BaseModel):
+    '''Mahalanobis distance with low-rank covariance matrices.
+
+    For each label, the covariance matrix is approximated from the thin SVD
+    of the centered data: the rank leading principal directions keep their
+    variances, while the variance in the remaining directions is replaced
+    by their average (as in the probabilistic PCA by M. E. Tipping and
+    C. M. Bishop). The optional regularization is added to all variances,
+    as for the covariance matrix cov + regularization * I. Without it,
+    if there is no variance left outside the principal directions (e.g. for
+    n <= rank + 1), the distance is measured only along these directions.
+
+    Unlike the full Mahalanobis distance, it is well-defined also for less
+    training vectors than the dimension (n < d), when the sample covariance
+    matrix is singular. Fitting costs O(n² d) per label and scoring O(N d k),
+    instead of O(d³) and O(N d²), and no d x d matrix is ever stored.
+    '''
+
+    def __init__(self, rank=10, regularization=0.0, dtype=None, n_jobs=None):
+        super().__init__(dtype, n_jobs)
+        self.rank = rank
+        self.regularization = regularization
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.rank})'
+
+    def fit(self, X: np.ndarray, y: np.ndarray | None = None) -> bool:
+        super().fit(X, y)
+        self.means = dict()
+        self.components = dict()
+        self.variances = dict()
+        self.residuals = dict()
+
+        factors = self._map_labels(self._fit_label)
+
+        for label, (mean, components, variances, residual) \
+                in factors.items():
+            self.means[label] = mean
+            self.components[label] = components
+            self.variances[label] = variances
+            self.residuals[label] = residual
+
+        return True
+
+    def score(self, X: np.ndarray, y: object = None) -> np.ndarray:
+        super().score(X, y)
+        X = self._cast(X)
+
+        diff = X - self.means[y]
+        projections = np.dot(diff, self.components[y])
+        squares = np.dot(projections**2, 1 / self.variances[y])
+
+        # The squared norm of the part of difference outside the principal
+        # subspace is the squared norm of the whole difference minus the one of
+        # its projection.
+        if self.residuals[y] > 0:
+            rest = np.einsum('ij,ij->i', diff, diff) \
+                - np.einsum('ij,ij->i', projections, projections)
+            squares += np.maximum(rest, 0) / self.residuals[y]
+
+        return np.sqrt(squares)
+
+    def _fit_label(self, label: object) -> tuple:
+        '''Calculates the principal directions and variances of a label.'''
+        data = self.X[self.index[label]]
+        samples, dimension = data.shape
+
+        mean = data.mean(axis=0, dtype=np.float64)
+        _, singular, vt = np.linalg.svd(data - mean, full_matrices=False)
+        variances = singular**2 / max(samples - 1, 1)
+
+        # The directions of (numerically) zero variance carry no information,
+        # so they are never kept.
+        tolerance = variances[:1].sum() * max(samples, dimension) \
+            * np.finfo(variances.dtype).eps
+        variances[variances <= tolerance] = 0
+        rank = min(self.rank, np.count_nonzero(variances))
+
+        residual = 0.0
+        if dimension > rank:
+            residual = variances[rank:].sum() / (dimension - rank)
+
+        return (self._cast(mean), self._cast(vt[:rank].T),
+                variances[:rank] + self.regularization,
+                residual + self.regularization)
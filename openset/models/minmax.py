@@ -2,10 +2,10 @@
 
 import numpy as np
 
-from ..models.base import BaseModel
+from ..models.moments import MomentsModel
 
 
-class MinMaxOutFactor(BaseModel):
+class MinMaxOutFactor(MomentsModel):
     '''Min-Max Out Factor distance.
 
     Returns the number fraction of features that are out of typical values,
@@ -13,27 +13,31 @@ class MinMaxOutFactor(BaseModel):
     e.g. `0.25` means that the 25% of features are out of min-max ranges.
     '''
 
-    def fit(self, X: np.ndarray, y: np.ndarray | None = None) -> bool:
-        super().fit(X, y)
+    def _fit_moments(self) -> None:
         self.mins = dict()
         self.maxes = dict()
 
         for label in self.labels:
-            self.mins[label] = self.X[self.y == label].min(axis=0)
-            self.maxes[label] = self.X[self.y == label].max(axis=0)
-
-        return True
+            self.mins[label] = self._cast(self.moments[label].min)
+            self.maxes[label] = self._cast(self.moments[label].max)
 
     def score(self, X: np.ndarray, y: object = None) -> np.ndarray:
         super().score(X, y)
+        X = self._cast(X)
 
         in_ranges = (self.mins[y] <= X) & (X <= self.maxes[y])
         distances = (~in_ranges).sum(axis=1) / in_ranges.shape[1]
 
         return distances
 
+    def score_all(self, X: np.ndarray) -> np.ndarray:
+        # The labels are scored one by one (into the columns of result),
+        # as broadcasting the data over all labels at once would need
+        # L times more memory for the temporary arrays, with no gain.
+        return super().score_all(self._cast(X))
+
 
-class MinMaxOutScore(BaseModel):
+class MinMaxOutScore(MomentsModel):
     '''Min-Max Out Score distance.
 
     Returns the sum of standardized distances from the cluster typical values
@@ -41,21 +45,19 @@ class MinMaxOutScore(BaseModel):
     values lie within the min-max box/window).
     '''
 
-    def fit(self, X: np.ndarray, y: np.ndarray | None = None) -> bool:
-        super().fit(X, y)
+    def _fit_moments(self) -> None:
         self.mins = dict()
         self.maxes = dict()
         self.vars = dict()
 
         for label in self.labels:
-            self.mins[label] = self.X[self.y == label].min(axis=0)
-            self.maxes[label] = self.X[self.y == label].max(axis=0)
-            self.vars[label] = self.X[self.y == label].var(axis=0)
-
-        return True
+            self.mins[label] = self._cast(self.moments[label].min)
+            self.maxes[label] = self._cast(self.moments[label].max)
+            self.vars[label] = self._cast(self.moments[label].var)
 
     def score(self, X: np.ndarray, y: object = None) -> np.ndarray:
         super().score(X, y)
+        X = self._cast(X)
 
         distances = (
             (1 / self.vars[y])
@@ -68,3 +70,7 @@ class MinMaxOutScore(BaseModel):
         ).sum(axis=1)**0.5
 
         return distances
+
+    def score_all(self, X: np.ndarray) -> np.ndarray:
+        # The labels are scored one by one, as in MinMaxOutFactor.
+        return super().score_all(self._cast(X))
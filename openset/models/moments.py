@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+
+from abc import abstractmethod
+from collections.abc import Iterable
+from functools import partial
+import os
+
+import numpy as np
+
+from ..models.base import BaseModel
+from ..models.base import group_by_labels
+
+
+def _sorted_labels(moments: dict) -> np.ndarray:
+    '''Returns the array of labels, as it would be given by np.unique().'''
+    labels = list(moments)
+
+    if labels == [None]:  # the default label
+        return np.array(labels)
+
+    return np.unique(labels)
+
+
+class Moments(object):
+    '''Mergeable statistics of a data cluster.
+
+    Holds the number of vectors, their mean, the sum of squared deviations
+    from the mean (per feature) and the feature-wise minimums and maximums.
+    Optionally, also the scatter matrix, i.e. the sum of outer products of
+    deviations from the mean, is kept (needed for the covariance matrix).
+    The statistics of separate batches of data can be merged exactly (up to
+    the floating point precision), using the pairwise update formulas
+    by T. F. Chan et al., so they can be computed in a streaming fashion
+    or independently for the data shards and combined afterwards.
+    '''
+
+    def __init__(self, dimension: int, scatter: bool = False):
+        self.count = 0
+        self.mean = np.zeros(dimension)
+        self.m2 = np.zeros(dimension)
+        self.min = np.full(dimension, np.inf)
+        self.max = np.full(dimension, -np.inf)
+        self.scatter = np.zeros((dimension, dimension)) if scatter else None
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.count})'
+
+    @classmethod
+    def from_data(cls, X: np.ndarray, scatter: bool = False) -> 'Moments':
+        '''Calculates the statistics of a given data cluster.'''
+        moments = cls(X.shape[1], scatter)
+
+        if X.shape[0]:
+            mean = X.mean(axis=0, dtype=np.float64)  # also for float32 data
+            deviations = X - mean
+
+            moments.count = X.shape[0]
+            moments.mean = mean
+            moments.m2 = (deviations**2).sum(axis=0)
+            moments.min = X.min(axis=0)
+            moments.max = X.max(axis=0)
+
+            if scatter:
+                moments.scatter = np.dot(deviations.T, deviations)
+
+        return moments
+
+    @property
+    def sum(self) -> np.ndarray:
+        '''The feature-wise sum of vectors.'''
+        return self.mean * self.count
+
+    @property
+    def var(self) -> np.ndarray:
+        '''The feature-wise variance (biased, as in np.var).'''
+        return self.m2 / self.count
+
+    @property
+    def cov(self) -> np.ndarray:
+        '''The covariance matrix (unbiased, as in np.cov).'''
+        return self.scatter / (self.count - 1)
+
+    def update(self, X: np.ndarray) -> 'Moments':
+        '''Includes a given batch of vectors in the statistics.'''
+        return self.merge(self.from_data(X, self.scatter is not None))
+
+    def merge(self, other: 'Moments') -> 'Moments':
+        '''Includes the statistics of another data cluster in these ones.'''
+        if not other.count:
+            return self
+
+        if self.scatter is not None and other.scatter is None:
+            raise ValueError('Cannot merge statistics without scatter matrix')
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        weight = self.count * other.count / count
+
+        self.mean = self.mean + delta * (other.count / count)
+        self.m2 = self.m2 + other.m2 + delta**2 * weight
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        self.count = count
+
+        if self.scatter is not None:
+            self.scatter = self.scatter + other.scatter \
+                + np.outer(delta, delta) * weight
+
+        return self
+
+
+def label_moments(X: np.ndarray, y: np.ndarray | None = None,
+                  scatter: bool = False) -> dict:
+    '''Calculates the statistics of data for each label separately.'''
+    X, y, labels, index = group_by_labels(X, y)
+
+    return {label: Moments.from_data(X[index[label]], scatter)
+            for label in labels}
+
+
+def merge_label_moments(moments: dict, other: dict) -> dict:
+    '''Includes the per-label statistics of other in moments (in place).'''
+    for label, value in other.items():
+        if label in moments:
+            moments[label].merge(value)
+        else:
+            moments[label] = value
+
+    return moments
+
+
+def shard_moments(shard: object, scatter: bool = False) -> dict:
+    '''Calculates the per-label statistics of data shard.
+
+    The shard is either the data cluster X or a pair (X, y) with the labels,
+    where X and y are given as arrays or paths to the .npy files (which are
+    loaded as memory-mapped arrays).
+    '''
+    X, y = shard if isinstance(shard, tuple) else (shard, None)
+
+    if isinstance(X, (str, os.PathLike)):
+        X = np.load(X, mmap_mode='r')
+    if isinstance(y, (str, os.PathLike)):
+        y = np.load(y, mmap_mode='r')
+
+    return label_moments(X, y, scatter)
+
+
+class MomentsModel(BaseModel):
+    '''Abstract class for a model built only from the statistics of data.
+
+    Such models need only the per-label Moments (stored in self.moments),
+    so besides the regular fit(), they can be trained incrementally with
+    partial_fit(), from a stream of batches, using O(L·D) memory, or from
+    the statistics computed separately for the data shards with fit_shards().
+    The subclasses shall prepare their parameters in _fit_moments() and set
+    the `scatter` attribute, if they need the scatter matrices.
+    '''
+
+    scatter = False
+
+    def fit(self, X: np.ndarray, y: np.ndarray | None = None) -> bool:
+        super().fit(X, y)
+        self.moments = self._map_labels(
+            lambda label: Moments.from_data(self.X[self.index[label]],
+                                            self.scatter)
+        )
+
+        # The statistics are all that the model needs, so the training data
+        # are not kept (nor saved or shared along with the model).
+        del self.X, self.y, self.index
+
+        self._fit_moments()
+
+        return True
+
+    def fit_moments(self, moments: dict) -> bool:
+        '''Prepares a model from the per-label statistics of known data.
+
+        Parameters
+        ----------
+        moments : dict
+            The statistics of data, given as Moments for each label,
+            e.g. as returned by label_moments() or merge_label_moments().
+
+        Returns
+        -------
+        result : bool
+            The status of model preparation – True for success.
+        '''
+        self.moments = moments
+        self.labels = _sorted_labels(self.moments)
+
+        self._fit_moments()
+
+        return True
+
+    def fit_shards(self, shards: Iterable, runner: object = None) -> bool:
+        '''Prepares a model from the data split into multiple shards.
+
+        The statistics of shards are computed in parallel processes, using
+        the given Runner instance (or a new one with default settings), and
+        reduced into the statistics of the whole data set.
+
+        Parameters
+        ----------
+        shards : Iterable
+            The data shards, each given as X or (X, y), where X and y are
+            arrays or paths to the .npy files; see shard_moments().
+        runner : Runner, optional
+            The runner used to process the shards in parallel.
+
+        Returns
+        -------
+        result : bool
+            The status of model preparation – True for success.
+        '''
+        if runner is None:
+            from ..utils.runner import Runner
+            runner = Runner()
+
+        function = partial(shard_moments, scatter=self.scatter)
+        moments = runner.reduce(merge_label_moments, dict(),
+                                function, shards)
+
+        return self.fit_moments(moments)
+
+    def partial_fit(self, X: np.ndarray, y: np.ndarray | None = None) -> bool:
+        '''Updates the model with a batch of the known data.
+
+        Unlike fit(), the consecutive calls extend the model with new data
+        instead of replacing it. The training vectors are not stored.
+
+        Parameters
+        ----------
+        X : np.ndarray
+            The data cluster, represented as a collection of feature vectors.
+            The array shape (N, D) corresponds to N samples of dimension D.
+        y : np.ndarray | None, optional
+            The labels for feature vectors, given as an array of shape (N, 1).
+            If omitted, all elements of X are assigned with same default label.
+
+        Returns
+        -------
+        result : bool
+            The status of model preparation – True for success.
+
+        Examples
+        --------
+        N/A
+        '''
+        if not hasattr(self, 'moments'):  # the first batch
+            self.moments = dict()
+
+        merge_label_moments(self.moments, label_moments(X, y, self.scatter))
+        self.labels = _sorted_labels(self.moments)
+
+        self._fit_moments()
+
+        return True
+
+    @abstractmethod
+    def _fit_moments(self) -> None:
+        '''Prepares the model parameters from the per-label statistics.'''
+        pass  # The model-specific implementation should come here
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+
+import copy
+
+import numpy as np
+from sklearn.neighbors import KDTree
+
+from ..models.base import MEMORY_BUDGET
+
+
+# The dimension from which the trees are no better than the brute-force search
+# (as in scikit-learn's heuristic), used for the automatic selection of the
+# algorithm.
+BRUTE_DIMENSION = 16
+
+ALGORITHMS = ('auto', 'brute', 'rpforest', 'tree')
+
+
+def resolve_algorithm(algorithm: object, dimension: int) -> object:
+    '''Returns the neighbors search algorithm to use for given dimension.
+
+    The algorithm is one of ALGORITHMS or an (unfitted) index instance,
+    e.g. RandomProjectionForest with custom parameters, returned as is.
+    '''
+    if isinstance(algorithm, BruteNeighbors):
+        return algorithm
+
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f'Unknown algorithm: {algorithm}')
+
+    if algorithm == 'auto':
+        return 'brute' if dimension >= BRUTE_DIMENSION else 'tree'
+
+    return algorithm
+
+
+def build_index(X: np.ndarray, algorithm: object = 'auto',
+                n_neighbors: int = 5) -> object:
+    '''Prepares the nearest neighbors index of the data.
+
+    The returned object provides the query(X, k, return_distance) method,
+    as in the scikit-learn KDTree. Given an index instance as the algorithm,
+    its copy is fitted, so the same instance can be used for many labels.
+    '''
+    algorithm = resolve_algorithm(algorithm, X.shape[1])
+
+    if isinstance(algorithm, BruteNeighbors):
+        index = copy.copy(algorithm)
+        index.n_neighbors = n_neighbors
+        return index.fit(X)
+    if algorithm == 'brute':
+        return BruteNeighbors(n_neighbors).fit(X)
+    if algorithm == 'rpforest':
+        return RandomProjectionForest(n_neighbors).fit(X)
+
+    return KDTree(X)
+
+
+class BruteNeighbors(object):
+    '''Exact nearest neighbors search with blocked matrix multiplication.
+
+    The squared distances are calculated as ||x||² - 2<x, v> + ||v||²,
+    where the squared norms of training vectors v are computed once in fit()
+    and the products for a block of query vectors x come from a single matrix
+    multiplication (GEMM), as in scikit-learn euclidean_distances(). Then,
+    the k smallest values are selected in linear time with np.argpartition()
+    and only these are sorted, instead of the whole rows of distances.
+
+    The interface follows the scikit-learn KDTree (query() method) and
+    NearestNeighbors (kneighbors() method) classes.
+    '''
+
+    def __init__(self, n_neighbors=5, memory_budget=MEMORY_BUDGET):
+        self.n_neighbors = n_neighbors
+        self.memory_budget = memory_budget
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.n_neighbors})'
+
+    def fit(self, X: np.ndarray) -> 'BruteNeighbors':
+        '''Stores the training data and their squared norms.'''
+        self.data = X
+        self.norms = np.einsum('ij,ij->i', X, X)
+
+        return self
+
+    def query(self, X: np.ndarray, k: int = 1,
+              return_distance: bool = True) -> tuple | np.ndarray:
+        '''Finds the k nearest neighbors of vectors, sorted by distance.'''
+        X = np.asarray(X)
+        samples = self.data.shape[0]
+
+        if not 1 <= k <= samples:
+            raise ValueError(f'k must be between 1 and {samples}')
+
+        distances = np.empty((X.shape[0], k))
+        indices = np.empty((X.shape[0], k), dtype=np.intp)
+
+        size = 8 * 2 * samples  # products and partition indices
+        block = max(1, self.memory_budget // size)
+
+        for start in range(0, X.shape[0], block):
+            vectors = X[start:start + block]
+
+            squares = np.dot(vectors, self.data.T)
+            squares *= -2
+            squares += self.norms
+            squares += np.einsum('ij,ij->i', vectors, vectors)[:, np.newaxis]
+
+            if k < samples:
+                candidates = np.argpartition(squares, k - 1, axis=1)[:, :k]
+                squares = np.take_along_axis(squares, candidates, axis=1)
+            else:
+                candidates = np.broadcast_to(np.arange(samples),
+                                             squares.shape)
+
+            order = np.argsort(squares, axis=1, kind='stable')
+            squares = np.take_along_axis(squares, order, axis=1)
+
+            # The rounding errors may give negative values.
+            distances[start:start + block] = np.sqrt(np.maximum(squares, 0))
+            indices[start:start + block] = np.take_along_axis(candidates,
+                                                              order, axis=1)
+
+        if return_distance:
+            return distances, indices
+
+        return indices
+
+    def kneighbors(self, X: np.ndarray | None = None,
+                   n_neighbors: int | None = None,
+                   return_distance: bool = True) -> tuple | np.ndarray:
+        '''Finds the nearest neighbors, as in scikit-learn NearestNeighbors.
+
+        If X is omitted, the neighbors of training vectors are returned,
+        excluding each vector itself.
+        '''
+        k = n_neighbors or self.n_neighbors
+
+        if X is not None:
+            return self.query(X, k, return_distance)
+
+        samples = self.data.shape[0]
+        distances, indices = self.query(self.data, k + 1)
+
+        # In case of duplicates, the vector may not be among its neighbors;
+        # then the farthest neighbor is dropped.
+        own = indices == np.arange(samples)[:, np.newaxis]
+        own[~own.any(axis=1), -1] = True
+
+        distances = distances[~own].reshape(samples, k)
+        indices = indices[~own].reshape(samples, k)
+
+        if return_distance:
+            return distances, indices
+
+        return indices
+
+
+class RandomProjectionForest(BruteNeighbors):
+    '''Approximate nearest neighbors search with random projection trees.
+
+    Each tree splits the data recursively into halves by the median of their
+    projections on a random direction (one direction per tree level), until
+    the leaves hold from leaf_size to 2 * leaf_size vectors. The candidates
+    for neighbors of a query vector are the vectors from its leaves in all
+    the trees, from which the k nearest are selected exactly.
+
+    More trees (n_trees) or larger leaves (leaf_size) give the better recall
+    at the cost of speed. For k greater than leaf_size, the exact search
+    is used. The trees are built level by level, for all nodes at once.
+    '''
+
+    def __init__(self, n_neighbors=5, n_trees=20, leaf_size=64, seed=42,
+                 memory_budget=MEMORY_BUDGET):
+        super().__init__(n_neighbors, memory_budget)
+        self.n_trees = n_trees
+        self.leaf_size = leaf_size
+        self.seed = seed
+
+    def fit(self, X: np.ndarray) -> 'RandomProjectionForest':
+        '''Builds the trees of the training data.'''
+        super().fit(X)
+        samples, dimension = X.shape
+
+        rng = np.random.default_rng(self.seed)
+        self.depth = max(0, int(np.log2(samples / self.leaf_size)))
+        self.directions = []
+        self.thresholds = []
+        self.orders = []
+
+        for _ in range(self.n_trees):
+            directions = rng.standard_normal((self.depth, dimension))
+            projections = np.dot(X, directions.T)
+            thresholds = np.empty(2**self.depth - 1)
+            order = np.arange(samples)
+
+            for level in range(self.depth):
+                nodes = 2**level
+                bounds = np.arange(nodes + 1) * samples // nodes
+                segments = np.repeat(np.arange(nodes), np.diff(bounds))
+
+                values = projections[order, level]
+                permutation = np.lexsort((values, segments))
+                order = order[permutation]
+                values = values[permutation]
+
+                # The sorted halves of each node (segment) are the nodes of the
+                # next level.
+                middles = np.arange(1, 2 * nodes, 2) * samples // (2 * nodes)
+                thresholds[nodes - 1:2 * nodes - 1] = \
+                    (values[middles - 1] + values[middles]) / 2
+
+            self.directions.append(directions.astype(X.dtype, copy=False))
+            self.thresholds.append(thresholds)
+            self.orders.append(order)
+
+        return self
+
+    def query(self, X: np.ndarray, k: int = 1,
+              return_distance: bool = True) -> tuple | np.ndarray:
+        '''Finds approximately the k nearest neighbors of vectors.'''
+        X = np.asarray(X)
+        samples = self.data.shape[0]
+
+        if k > self.leaf_size or self.depth == 0:
+            return super().query(X, k, return_distance)
+
+        leaves = 2**self.depth
+        bounds = np.arange(leaves + 1) * samples // leaves
+        width = np.diff(bounds).max()
+
+        distances = np.empty((X.shape[0], k))
+        indices = np.empty((X.shape[0], k), dtype=np.intp)
+
+        candidates = self.n_trees * width
+        size = 8 * candidates * (X.shape[1] + 2)  # vectors and distances
+        block = max(1, self.memory_budget // size)
+
+        for start in range(0, X.shape[0], block):
+            vectors = X[start:start + block]
+            found = np.empty((len(vectors), candidates), dtype=np.intp)
+
+            for tree, (directions, thresholds, order) in enumerate(
+                zip(self.directions, self.thresholds, self.orders)
+            ):
+                projections = np.dot(vectors, directions.T)
+                nodes = np.zeros(len(vectors), dtype=np.intp)
+
+                for level in range(self.depth):
+                    nodes = 2 * nodes + 1 \
+                        + (projections[:, level] > thresholds[nodes])
+
+                leaf = nodes - (leaves - 1)
+                positions = bounds[leaf][:, np.newaxis] + np.arange(width)
+
+                # The smaller leaves are padded with the last vector of leaf,
+                # removed below as a duplicate.
+                positions = np.minimum(positions,
+                                       bounds[leaf + 1][:, np.newaxis] - 1)
+                found[:, tree * width:(tree + 1) * width] = order[positions]
+
+            found.sort(axis=1)
+            duplicates = np.zeros(found.shape, dtype=bool)
+            duplicates[:, 1:] = found[:, 1:] == found[:, :-1]
+
+            differences = self.data[found] - vectors[:, np.newaxis]
+            squares = np.einsum('nkd,nkd->nk', differences, differences)
+            squares[duplicates] = np.inf
+
+            nearest = np.argpartition(squares, k - 1, axis=1)[:, :k]
+            squares = np.take_along_axis(squares, nearest, axis=1)
+            ranking = np.argsort(squares, axis=1, kind='stable')
+
+            distances[start:start + block] = np.sqrt(
+                np.take_along_axis(squares, ranking, axis=1)
+            )
+            indices[start:start + block] = np.take_along_axis(
+                np.take_along_axis(found, nearest, axis=1), ranking, axis=1
+            )
+
+        if return_distance:
+            return distances, indices
+
+        return indices
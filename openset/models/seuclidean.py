@@ -1,29 +1,27 @@
 #!/usr/bin/env python3
 
 import numpy as np
-from scipy.spatial.distance import seuclidean
 
 from ..models.base import BaseModel
+from ..models.centroid import CentroidModel
 
 
-class SEuclidean(BaseModel):
+class SEuclidean(CentroidModel):
     '''Standardized Euclidean distance.'''
 
-    def fit(self, X: np.ndarray, y: np.ndarray | None = None) -> bool:
-        super().fit(X, y)
-        self.means = dict()
+    metric = 'seuclidean'
+
+    def _fit_moments(self) -> None:
+        super()._fit_moments()
         self.vars = dict()
 
         for label in self.labels:
-            self.means[label] = self.X[self.y == label].mean(axis=0)
-            self.vars[label] = self.X[self.y == label].var(axis=0)
-
-        return True
-
-    def score(self, X: np.ndarray, y: object = None) -> np.ndarray:
-        super().score(X, y)
+            self.vars[label] = self._cast(self.moments[label].var)
 
-        distances = np.array([seuclidean(vec, self.means[y], self.vars[y])
-                              for vec in X])
+    def score_all(self, X: np.ndarray) -> np.ndarray:
+        # The variances differ between labels, so the centroids cannot be
+        # compared with data in a single cdist() call.
+        return BaseModel.score_all(self, X)
 
-        return distances
+    def _metric_kwargs(self, y: object = None) -> dict:
+        return dict(V=self.vars[y])
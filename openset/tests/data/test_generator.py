@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 
+import os
+import tempfile
 from unittest import TestCase
+from unittest.mock import patch
 
 import numpy as np
 
@@ -63,6 +66,273 @@ class TestClusterGenerator(TestCase):
 
         np.testing.assert_almost_equal(actual, expected)
 
+    def test_mvn_factor(self):
+        generator = ClusterGenerator()
+        generator.reset(seed=42)
+
+        actual = generator.mvn(samples=200000, dimension=6, location=2.0,
+                               scale=[1.0, 2.0, 3.0, 1.0, 1.0, 4.0],
+                               n_features=0.5, n_correlated=0.5,
+                               covariance=0.7, sampler='factor')
+        expected = np.array([
+            [1.0, 0.7, 0.7, 0.0, 0.0, 0.0],
+            [0.7, 2.0, 0.7, 0.0, 0.0, 0.0],
+            [0.7, 0.7, 3.0, 0.0, 0.0, 0.0],
+            [0.0, 0.0, 0.0, 1.0, 0.0, 0.0],
+            [0.0, 0.0, 0.0, 0.0, 1.0, 0.0],
+            [0.0, 0.0, 0.0, 0.0, 0.0, 4.0],
+        ])
+
+        self.assertEqual(actual.shape, (200000, 6))
+        np.testing.assert_allclose(actual.mean(axis=0),
+                                   [2, 2, 2, 0, 0, 0], atol=0.02)
+        np.testing.assert_allclose(np.cov(actual, rowvar=False), expected,
+                                   atol=0.05)
+
+    def test_mvn_samplers(self):
+        generator = ClusterGenerator()
+        parameters = dict(samples=5, dimension=4, n_correlated=0.5)
+
+        # The default method is kept, so seeded data sets do not change
+        generator.reset(seed=42)
+        actual = generator.mvn(**parameters)
+        generator.reset(seed=42)
+        expected = generator.mvn(**parameters, sampler='dense')
+        np.testing.assert_array_equal(actual, expected)
+
+        generator.reset(seed=42)
+        actual = generator.mvn(**parameters, sampler='auto')
+        generator.reset(seed=42)
+        expected = generator.mvn(**parameters, sampler='factor')
+        np.testing.assert_array_equal(actual, expected)
+
+        generator.reset(seed=42, legacy=True)
+        actual = generator.mvn(**parameters, sampler='auto')
+        generator.reset(seed=42, legacy=True)
+        expected = generator.mvn(**parameters, sampler='dense')
+        np.testing.assert_array_equal(actual, expected)
+
+        # The matrix with negative covariance is sampled with the SVD
+        generator.reset(seed=42)
+        actual = generator.mvn(**parameters, covariance=-0.5, sampler='auto')
+        generator.reset(seed=42)
+        expected = generator.mvn(**parameters, covariance=-0.5,
+                                 sampler='dense')
+        np.testing.assert_array_equal(actual, expected)
+
+    def test_mvn_incorrect_sampler(self):
+        generator = ClusterGenerator()
+
+        with self.assertRaises(ValueError):
+            generator.mvn(sampler='cholesky')
+
+        with self.assertRaises(ValueError):
+            generator.mvn(dimension=4, n_correlated=0.5, covariance=2.0,
+                          sampler='factor')
+
+    def test_mvn_matrix(self):
+        generator = ClusterGenerator()
+        generator.reset(seed=42)
+
+        cov = np.array([
+            [2.0, 0.5, 0.0],
+            [0.5, 1.0, -0.3],
+            [0.0, -0.3, 0.5],
+        ])
+
+        actual = generator.mvn_matrix(samples=200000, mean=[1, 2, 3],
+                                      cov=cov)
+
+        self.assertEqual(actual.shape, (200000, 3))
+        np.testing.assert_allclose(actual.mean(axis=0), [1, 2, 3], atol=0.02)
+        np.testing.assert_allclose(np.cov(actual, rowvar=False), cov,
+                                   atol=0.02)
+
+    def test_mvn_matrix_singular(self):
+        generator = ClusterGenerator()
+        generator.reset(seed=42)
+
+        cov = np.array([[1.0, 1.0], [1.0, 1.0]])  # duplicated feature
+
+        actual = generator.mvn_matrix(samples=100, cov=cov)
+        np.testing.assert_allclose(actual[:, 0], actual[:, 1])
+
+        with self.assertRaises(ValueError):
+            generator.mvn_matrix(cov=np.array([[1.0, 2.0], [2.0, 1.0]]))
+
+        with self.assertRaises(ValueError):
+            generator.mvn_matrix(cov=np.ones((2, 3)))
+
+    def test_mvn_matrix_cache(self):
+        generator = ClusterGenerator()
+        generator.FACTORS_CACHE_SIZE = 2
+        matrices = [np.identity(2) * value for value in (1.0, 2.0, 3.0)]
+
+        with patch('numpy.linalg.cholesky',
+                   wraps=np.linalg.cholesky) as cholesky:
+            for cov in (matrices[0], matrices[1], matrices[0].copy(),
+                        matrices[2], matrices[0], matrices[1]):
+                generator.mvn_matrix(samples=3, cov=cov)
+
+        # The matrices 0, 1 and 2 are factorized, then 1 is evicted as
+        # the least recently used one and factorized again at the end
+        self.assertEqual(cholesky.call_count, 4)
+        self.assertEqual(len(generator.factors), 2)
+
+    def test_generate(self):
+        generator = ClusterGenerator()
+
+        values = [generator.generate('mvn', samples=50, dimension=4,
+                                     covariance=0.5, n_jobs=n_jobs,
+                                     block_size=8, seed=42)
+                  for n_jobs in (None, 1, 3, -1)]
+
+        self.assertEqual(values[0].shape, (50, 4))
+        for value in values[1:]:
+            np.testing.assert_equal(value, values[0])
+
+    def test_generate_matches_iter(self):
+        generator = ClusterGenerator()
+        cov = np.array([[1.0, 0.5], [0.5, 2.0]])
+
+        actual = generator.generate('mvn_matrix', samples=20, cov=cov,
+                                    n_jobs=2, block_size=6, seed=42)
+        chunks = generator.generate_iter('mvn_matrix', samples=20, cov=cov,
+                                         block_size=6, seed=42)
+
+        np.testing.assert_equal(actual, np.concatenate(list(chunks)))
+
+    def test_generate_mvn_sampler(self):
+        generator = ClusterGenerator()
+        parameters = dict(samples=20, dimension=4, n_correlated=0.5,
+                          sampler='factor', block_size=6, seed=42)
+
+        actual = generator.generate('mvn', n_jobs=2, **parameters)
+        chunks = generator.generate_iter('mvn', chunk_size=7, **parameters)
+
+        np.testing.assert_equal(actual, np.concatenate(list(chunks)))
+
+        # The blocks are drawn with the factor sampler indeed
+        sequence = np.random.SeedSequence(42).spawn(1)[0]
+        generator.rng = np.random.default_rng(sequence)
+        expected = generator.mvn(samples=6, dimension=4, n_correlated=0.5,
+                                 sampler='factor')
+        np.testing.assert_equal(actual[:6], expected)
+
+    def test_generate_seed(self):
+        generator = ClusterGenerator()
+
+        generator.reset(42)
+        values1 = generator.generate('uniform', samples=20, n_jobs=2)
+        values2 = generator.generate('uniform', samples=20, n_jobs=2)
+
+        generator.reset(42)
+        values3 = generator.generate('uniform', samples=20, n_jobs=2)
+
+        self.assertFalse(np.array_equal(values1, values2))
+        np.testing.assert_equal(values1, values3)
+
+    def test_generate_incorrect_method(self):
+        generator = ClusterGenerator()
+
+        with self.assertRaises(ValueError):
+            generator.generate('reset')
+
+    def test_generate_out(self):
+        generator = ClusterGenerator()
+        out = np.zeros((20, 3))
+
+        actual = generator.generate('gaussian', samples=20, dimension=3,
+                                    block_size=6, seed=42, out=out)
+        expected = generator.generate('gaussian', samples=20, dimension=3,
+                                      block_size=6, seed=42)
+
+        self.assertIs(actual, out)
+        np.testing.assert_equal(out, expected)
+
+    def test_generate_out_incorrect_shape(self):
+        generator = ClusterGenerator()
+
+        with self.assertRaises(ValueError):
+            generator.generate('gaussian', samples=20, dimension=3,
+                               out=np.zeros((20, 2)))
+
+    def test_generate_file(self):
+        generator = ClusterGenerator()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'cluster.npy')
+
+        cluster = generator.generate_file(path, 'uniform', samples=20,
+                                          dimension=3, n_jobs=2,
+                                          block_size=6, seed=42,
+                                          dtype=np.float32)
+        expected = generator.generate('uniform', samples=20, dimension=3,
+                                      block_size=6, seed=42)
+        del cluster  # closes the file
+
+        actual = np.load(path, mmap_mode='r')
+
+        self.assertEqual(actual.dtype, np.float32)
+        np.testing.assert_equal(actual, expected.astype(np.float32))
+
+    def test_generate_iter(self):
+        generator = ClusterGenerator()
+
+        chunks = list(generator.generate_iter('gaussian', samples=10,
+                                              dimension=3, chunk_size=4,
+                                              block_size=6))
+
+        self.assertEqual([chunk.shape for chunk in chunks],
+                         [(4, 3), (4, 3), (2, 3)])
+
+    def test_generate_iter_chunk_size(self):
+        generator = ClusterGenerator()
+        values = []
+
+        for chunk_size in (1, 3, 7, 50, 100):
+            chunks = generator.generate_iter('mvn', samples=50, dimension=4,
+                                             covariance=0.5, seed=42,
+                                             chunk_size=chunk_size,
+                                             block_size=8)
+            values.append(np.concatenate(list(chunks)))
+
+        for value in values[1:]:
+            np.testing.assert_equal(value, values[0])
+
+    def test_generate_iter_blocks(self):
+        generator = ClusterGenerator()
+
+        chunks = generator.generate_iter('uniform', samples=20, dimension=2,
+                                         seed=42, block_size=8)
+        actual = np.concatenate(list(chunks))
+
+        # The block 1 comes from the child 1 of seed sequence
+        sequence = np.random.SeedSequence(42).spawn(2)[1]
+        generator.rng = np.random.default_rng(sequence)
+        expected = generator.uniform(samples=8, dimension=2)
+
+        np.testing.assert_equal(actual[8:16], expected)
+
+    def test_generate_iter_seed(self):
+        generator = ClusterGenerator()
+
+        generator.reset(42)
+        values1 = np.concatenate(list(generator.generate_iter('triangular')))
+        values2 = np.concatenate(list(generator.generate_iter('triangular')))
+
+        generator.reset(42)
+        values3 = np.concatenate(list(generator.generate_iter('triangular')))
+
+        self.assertFalse(np.array_equal(values1, values2))
+        np.testing.assert_equal(values1, values3)
+
+    def test_generate_iter_incorrect_method(self):
+        generator = ClusterGenerator()
+
+        with self.assertRaises(ValueError):
+            next(generator.generate_iter('reset'))
+
     def test_traingular(self):
         generator = ClusterGenerator()
         generator.reset(seed=42, legacy=True)  # Compatibility guarantee
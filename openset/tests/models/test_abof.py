@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 
+from itertools import combinations
 from unittest import TestCase
 
 import numpy as np
@@ -10,6 +11,31 @@ from openset.models import FastAngleBasedOutlierFactor
 from openset.models import FastAngleBasedOutlierFactor2
 
 
+def reference(data, X, weighted=True):
+    '''Pairwise implementation of the (unweighted) angle-based factor.'''
+    variances = []
+
+    for vec in X:
+        angles = []
+        vectors = data - vec
+
+        for vec1, vec2 in combinations(vectors, 2):
+            norm1 = vec1.dot(vec1)
+            norm2 = vec2.dot(vec2)
+
+            if norm1 == 0 or norm2 == 0:
+                continue
+
+            if not weighted:
+                norm1, norm2 = np.sqrt(norm1), np.sqrt(norm2)
+
+            angles.append(vec1.dot(vec2) / norm1 / norm2)
+
+        variances.append(np.var(angles))
+
+    return -1 * np.array(variances)
+
+
 class TestAngleBasedOutlierFactor(TestCase):
     def test_fit(self):
         X = np.array([[0, 0], [0, 4], [2, 0], [2, 4]])
@@ -42,6 +68,37 @@ class TestAngleBasedOutlierFactor(TestCase):
         ])
         np.testing.assert_almost_equal(actual, expected)
 
+    def test_score_tiles(self):
+        rng = np.random.default_rng(42)
+        X = rng.normal(size=(40, 5))
+        X_test = np.vstack([X[:3], rng.normal(size=(10, 5))])
+
+        model = AngleBasedOutlierFactor(memory_budget=1)  # one vector a tile
+        model.fit(X)
+
+        actual = model.score(X_test)
+        expected = reference(X, X_test, weighted=True)
+        np.testing.assert_allclose(actual, expected, rtol=1e-9)
+
+    def test_score_blocks(self):
+        rng = np.random.default_rng(42)
+        X = rng.normal(size=(40, 5))
+        X_test = np.vstack([X[:3], rng.normal(size=(10, 5))])
+
+        # The Gram matrix of each vector is split into blocks of 15 samples
+        model = AngleBasedOutlierFactor(memory_budget=8 * (40 * 5 + 15**2))
+        model.fit(X)
+
+        actual = model.score(X_test)
+        expected = reference(X, X_test, weighted=True)
+        np.testing.assert_allclose(actual, expected, rtol=1e-9)
+
+        # The far outliers, with nearly equal values of all pairs
+        X_far = np.array([[3e3] * 5, [-3e4, 0, 0, 3e4, 0]])
+        actual = model.score(X_far)
+        expected = reference(X, X_far, weighted=True)
+        np.testing.assert_allclose(actual, expected, rtol=1e-6)
+
 
 class TestAngleBasedOutlierFactor2(TestCase):
     def test_fit(self):
@@ -75,6 +132,47 @@ class TestAngleBasedOutlierFactor2(TestCase):
         ])
         np.testing.assert_almost_equal(actual, expected)
 
+    def test_score_tiles(self):
+        rng = np.random.default_rng(42)
+        X = rng.normal(size=(40, 5))
+        X_test = np.vstack([X[:3], rng.normal(size=(10, 5))])
+
+        model = AngleBasedOutlierFactor2(memory_budget=8 * 40 * 45 * 4)
+        model.fit(X)
+
+        actual = model.score(X_test)
+        expected = reference(X, X_test, weighted=False)
+        np.testing.assert_allclose(actual, expected, rtol=1e-9)
+
+    def test_score_blocks(self):
+        rng = np.random.default_rng(42)
+        X = rng.normal(size=(40, 5))
+        X_test = np.vstack([X[:3], rng.normal(size=(10, 5))])
+
+        # The Gram matrix of each vector is split into blocks of 15 samples
+        model = AngleBasedOutlierFactor2(memory_budget=8 * (40 * 5 + 15**2))
+        model.fit(X)
+
+        actual = model.score(X_test)
+        expected = reference(X, X_test, weighted=False)
+        np.testing.assert_allclose(actual, expected, rtol=1e-9)
+
+        # The far outliers, with nearly equal values of all pairs
+        X_far = np.array([[3e3] * 5, [-3e4, 0, 0, 3e4, 0]])
+        actual = model.score(X_far)
+        expected = reference(X, X_far, weighted=False)
+        np.testing.assert_allclose(actual, expected, rtol=1e-6)
+
+    def test_score_single_sample(self):
+        X = np.array([[1, 1]])
+
+        model = AngleBasedOutlierFactor2()
+        model.fit(X)
+
+        actual = model.score(np.array([[0, 0], [1, 1]]))
+        expected = np.array([np.nan, np.nan])  # no pairs of vectors to compare
+        np.testing.assert_array_equal(actual, expected)
+
 
 class TestFastAngleBasedOutlierFactor(TestCase):
     def test_repr(self):
@@ -113,6 +211,36 @@ class TestFastAngleBasedOutlierFactor(TestCase):
         ])
         np.testing.assert_almost_equal(actual, expected)
 
+    def test_score_batch(self):
+        rng = np.random.default_rng(42)
+        X = rng.normal(size=(100, 5))
+        X_test = np.vstack([X[:3], rng.normal(size=(20, 5))])
+
+        model = FastAngleBasedOutlierFactor(7)
+        model.fit(X)
+
+        actual = model.score(X_test)
+        expected = np.concatenate([
+            reference(X[model.tree[None].query((vec, ), k=7)[1][0]],
+                      (vec, ), weighted=True)
+            for vec in X_test
+        ])
+        np.testing.assert_allclose(actual, expected, rtol=1e-9)
+
+    def test_score_tiles(self):
+        rng = np.random.default_rng(42)
+        X = rng.normal(size=(100, 5))
+        X_test = rng.normal(size=(20, 5))
+
+        # One vector a tile
+        model = FastAngleBasedOutlierFactor(7, memory_budget=1)
+        model.fit(X)
+        expected = FastAngleBasedOutlierFactor(7)
+        expected.fit(X)
+
+        np.testing.assert_allclose(model.score(X_test),
+                                   expected.score(X_test), rtol=1e-12)
+
     def test_small_dataset(self):
         X = np.array([[0, 0], [0, 1], [0, 2], [0, 3], [0, 4]])
 
@@ -129,6 +257,21 @@ class TestFastAngleBasedOutlierFactor(TestCase):
         ])
         np.testing.assert_almost_equal(actual, expected)
 
+    def test_algorithm(self):
+        rng = np.random.default_rng(42)
+        X = rng.normal(size=(300, 20))
+        y = rng.integers(0, 3, size=300)
+        X_test = rng.normal(scale=1.5, size=(50, 20))
+
+        tree = FastAngleBasedOutlierFactor(algorithm='tree')
+        tree.fit(X, y)
+
+        brute = FastAngleBasedOutlierFactor(algorithm='brute')
+        brute.fit(X, y)
+
+        np.testing.assert_allclose(brute.score_all(X_test),
+                                   tree.score_all(X_test), rtol=1e-9)
+
 
 class TestFastAngleBasedOutlierFactor2(TestCase):
     def test_repr(self):
@@ -167,6 +310,36 @@ class TestFastAngleBasedOutlierFactor2(TestCase):
         ])
         np.testing.assert_almost_equal(actual, expected)
 
+    def test_score_batch(self):
+        rng = np.random.default_rng(42)
+        X = rng.normal(size=(100, 5))
+        X_test = np.vstack([X[:3], rng.normal(size=(20, 5))])
+
+        model = FastAngleBasedOutlierFactor2(7)
+        model.fit(X)
+
+        actual = model.score(X_test)
+        expected = np.concatenate([
+            reference(X[model.tree[None].query((vec, ), k=7)[1][0]],
+                      (vec, ), weighted=False)
+            for vec in X_test
+        ])
+        np.testing.assert_allclose(actual, expected, rtol=1e-9)
+
+    def test_score_tiles(self):
+        rng = np.random.default_rng(42)
+        X = rng.normal(size=(100, 5))
+        X_test = rng.normal(size=(20, 5))
+
+        # One vector a tile
+        model = FastAngleBasedOutlierFactor2(7, memory_budget=1)
+        model.fit(X)
+        expected = FastAngleBasedOutlierFactor2(7)
+        expected.fit(X)
+
+        np.testing.assert_allclose(model.score(X_test),
+                                   expected.score(X_test), rtol=1e-12)
+
     def test_small_dataset(self):
         X = np.array([[0, 0], [0, 1], [0, 2], [0, 3], [0, 4]])
 
@@ -182,3 +355,18 @@ class TestFastAngleBasedOutlierFactor2(TestCase):
             -0.094945,
         ])
         np.testing.assert_almost_equal(actual, expected)
+
+    def test_algorithm(self):
+        rng = np.random.default_rng(42)
+        X = rng.normal(size=(300, 20))
+        y = rng.integers(0, 3, size=300)
+        X_test = rng.normal(scale=1.5, size=(50, 20))
+
+        tree = FastAngleBasedOutlierFactor2(algorithm='tree')
+        tree.fit(X, y)
+
+        brute = FastAngleBasedOutlierFactor2(algorithm='brute')
+        brute.fit(X, y)
+
+        np.testing.assert_allclose(brute.score_all(X_test),
+                                   tree.score_all(X_test), rtol=1e-9)
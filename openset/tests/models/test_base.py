@@ -1,10 +1,14 @@
 #!/usr/bin/env python3
 
+import os
+import tempfile
+import threading
 from unittest import TestCase
 from unittest.mock import patch
 
 import numpy as np
 
+import openset.models
 from openset.models.base import BaseModel
 
 
@@ -59,6 +63,30 @@ class TestBaseModel(TestCase):
         np.testing.assert_array_equal(model.y, np.array([None, None]))
         self.assertEqual(model.labels, np.array([None]))
 
+    def test_fit_label_index(self):
+        X = np.array([[1, 2], [3, 4], [5, 6], [7, 8], [9, 0]])
+        y = np.array([2, 1, 2, 3, 1])
+
+        model = self.CustomModel()
+        model.fit(X, y)
+
+        np.testing.assert_array_equal(model.labels, np.array([1, 2, 3]))
+        np.testing.assert_array_equal(model.y, np.array([1, 1, 2, 2, 3]))
+
+        for label in model.labels:
+            actual = model.X[model.index[label]]
+            expected = X[y == label]  # stable order within label
+            np.testing.assert_array_equal(actual, expected)
+
+    def test_fit_label_index_without_labels(self):
+        X = np.array([[1, 2], [3, 4]])
+
+        model = self.CustomModel()
+        model.fit(X)
+
+        self.assertIs(model.X, X)  # no copy is needed in this case
+        self.assertEqual(model.index, {None: slice(0, 2)})
+
     def test_fit_incorrect_labels(self):
         X = np.array([[1, 2], [3, 4]])
         y = np.array([1, 2, 3])
@@ -90,3 +118,271 @@ class TestBaseModel(TestCase):
         model.fit(X, y)
         with self.assertRaises(ValueError):
             model.score(X, None)
+
+    def test_score_all(self):
+        X = np.array([[1, 2], [3, 4], [5, 6]])
+        y = np.array(['b', 'a', 'b'])
+
+        model = self.CustomModel()
+        model.fit(X, y)
+
+        scores = {'a': np.array([1, 2]), 'b': np.array([3, 4])}
+        with patch.object(model, 'score',
+                          side_effect=lambda X, y: scores[y]) as score:
+            actual = model.score_all(X[:2])
+
+        expected = np.array([[1, 3], [2, 4]])
+        np.testing.assert_array_equal(actual, expected)
+        self.assertEqual(score.call_count, 2)
+
+    def test_score_iter_array(self):
+        X = np.arange(20).reshape(10, 2)
+
+        model = self.CustomModel()
+        model.fit(X)
+
+        with patch.object(model, 'score',
+                          side_effect=lambda X, y: X.sum(axis=1)) as score:
+            chunks = list(model.score_iter(X, memory_budget=3 * 4 * 8 * 2))
+
+        self.assertEqual(score.call_count, 4)  # 3 vectors per chunk
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 3, 3, 1])
+        np.testing.assert_array_equal(np.concatenate(chunks), X.sum(axis=1))
+
+    def test_score_iter_batches(self):
+        X = np.arange(20).reshape(10, 2)
+
+        model = self.CustomModel()
+        model.fit(X)
+
+        batches = (X[:4], X[4:], X[:0])
+        with patch.object(model, 'score',
+                          side_effect=lambda X, y: X.sum(axis=1)):
+            chunks = list(model.score_iter(iter(batches)))
+
+        self.assertEqual([len(chunk) for chunk in chunks], [4, 6])
+        np.testing.assert_array_equal(np.concatenate(chunks), X.sum(axis=1))
+
+
+class TestBaseModelDtype(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.X = rng.normal(size=(80, 8))
+        self.y = rng.integers(0, 2, size=80)
+        self.X_test = rng.normal(scale=1.5, size=(20, 8))
+
+    def test_fit_dtype(self):
+        model = TestBaseModel.CustomModel(dtype=np.float32)
+        model.fit(self.X, self.y)
+
+        self.assertEqual(model.X.dtype, np.float32)
+        np.testing.assert_allclose(model.X[model.index[0]],
+                                   self.X[self.y == 0], rtol=1e-7)
+
+    def test_float32_deviation(self):
+        for name in openset.models.__all__:
+            Model = getattr(openset.models, name)
+
+            model64 = Model()
+            model64.fit(self.X, self.y)
+
+            model32 = Model(dtype=np.float32)
+            model32.fit(self.X, self.y)
+
+            actual = model32.score_all(self.X_test)
+            expected = model64.score_all(self.X_test)
+            np.testing.assert_allclose(actual, expected, rtol=1e-5,
+                                       err_msg=name)
+
+    def test_float32_parameters(self):
+        parameters = {
+            'Euclidean': ('means', ),
+            'IntegratedRankWeightedDepth': ('U', 'M'),
+            'Mahalanobis': ('means', 'chols'),
+            'MinMaxOutScore': ('mins', 'maxes', 'vars'),
+            'SEuclidean': ('means', 'vars'),
+        }
+
+        for name, attributes in parameters.items():
+            model = getattr(openset.models, name)(dtype=np.float32)
+            model.fit(self.X, self.y)
+
+            for attribute in attributes:
+                for label in model.labels:
+                    actual = getattr(model, attribute)[label].dtype
+                    self.assertEqual(actual, np.float32, f'{name}.{attribute}')
+
+
+class TestBaseModelJobs(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.X = rng.normal(size=(200, 5))
+        self.y = rng.integers(0, 8, size=200)
+        self.X_test = rng.normal(scale=1.5, size=(20, 5))
+
+    def test_map_labels(self):
+        model = TestBaseModel.CustomModel(n_jobs=4)
+        model.fit(self.X, self.y)
+
+        actual = model._map_labels(
+            lambda label: (label, threading.get_ident())
+        )
+
+        self.assertEqual(list(actual), list(model.labels))
+        self.assertEqual([value[0] for value in actual.values()],
+                         list(model.labels))
+        self.assertNotIn(threading.get_ident(),
+                         [value[1] for value in actual.values()])
+
+    def test_map_labels_serial(self):
+        model = TestBaseModel.CustomModel()
+        model.fit(self.X, self.y)
+
+        actual = model._map_labels(lambda label: threading.get_ident())
+
+        self.assertEqual(set(actual.values()), {threading.get_ident()})
+
+    @patch('openset.models.base.os.cpu_count')
+    def test_workers(self, mock_cpu_count):
+        mock_cpu_count.return_value = 6
+
+        self.assertEqual(TestBaseModel.CustomModel()._workers(), 1)
+        self.assertEqual(TestBaseModel.CustomModel(n_jobs=3)._workers(), 3)
+        self.assertEqual(TestBaseModel.CustomModel(n_jobs=-1)._workers(), 6)
+
+    def test_parallel_fit(self):
+        for name in ('FastAngleBasedOutlierFactor', 'KNearestNeighbors',
+                     'LocalOutlierFactor', 'Mahalanobis', 'SEuclidean'):
+            Model = getattr(openset.models, name)
+
+            serial = Model()
+            serial.fit(self.X, self.y)
+
+            parallel = Model(n_jobs=4)
+            parallel.fit(self.X, self.y)
+
+            actual = parallel.score_all(self.X_test)
+            expected = serial.score_all(self.X_test)
+            np.testing.assert_array_equal(actual, expected, err_msg=name)
+
+    def test_map_chunks(self):
+        model = TestBaseModel.CustomModel(n_jobs=4)
+
+        threads = set()
+
+        def function(X, offset):
+            threads.add(threading.get_ident())
+            return X[:, 0] + offset
+
+        actual = model._map_chunks(function, np.arange(10)[:, np.newaxis], 1)
+
+        np.testing.assert_array_equal(actual, np.arange(1, 11))
+        self.assertNotIn(threading.get_ident(), threads)
+
+    def test_map_chunks_serial(self):
+        model = TestBaseModel.CustomModel()
+
+        actual = model._map_chunks(
+            lambda X: np.full(len(X), threading.get_ident()), self.X
+        )
+
+        np.testing.assert_array_equal(actual, threading.get_ident())
+
+    @patch.dict('openset.models.base.os.environ', OPENSET_NUM_THREADS='2')
+    def test_workers_limited(self):
+        self.assertEqual(TestBaseModel.CustomModel()._workers(), 1)
+        self.assertEqual(TestBaseModel.CustomModel(n_jobs=4)._workers(), 2)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            TestBaseModel.CustomModel(backend='cluster')
+
+    def test_parallel_score(self):
+        for name in ('AngleBasedOutlierFactor', 'AngleBasedOutlierFactor2',
+                     'FastAngleBasedOutlierFactor',
+                     'FastAngleBasedOutlierFactor2',
+                     'IntegratedRankWeightedDepth'):
+            Model = getattr(openset.models, name)
+
+            serial = Model()
+            serial.fit(self.X, self.y)
+
+            parallel = Model(n_jobs=4)
+            parallel.fit(self.X, self.y)
+
+            actual = parallel.score_all(self.X_test)
+            expected = serial.score_all(self.X_test)
+            np.testing.assert_allclose(actual, expected, rtol=1e-12,
+                                       err_msg=name)
+
+    def test_parallel_score_processes(self):
+        for name in ('FastAngleBasedOutlierFactor',
+                     'IntegratedRankWeightedDepth'):
+            Model = getattr(openset.models, name)
+
+            serial = Model()
+            serial.fit(self.X, self.y)
+
+            parallel = Model(n_jobs=2, backend='processes')
+            parallel.fit(self.X, self.y)
+
+            actual = parallel.score(self.X_test, parallel.labels[1])
+            expected = serial.score(self.X_test, serial.labels[1])
+            np.testing.assert_allclose(actual, expected, rtol=1e-12,
+                                       err_msg=name)
+
+
+class TestBaseModelPersistence(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.X = rng.normal(size=(200, 5))
+        self.y = rng.integers(0, 4, size=200)
+        self.X_test = rng.normal(scale=1.5, size=(20, 5))
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_save_load(self):
+        for name in ('FastAngleBasedOutlierFactor', 'KNearestNeighbors',
+                     'IntegratedRankWeightedDepth', 'Mahalanobis',
+                     'SEuclidean'):
+            Model = getattr(openset.models, name)
+            path = os.path.join(self.directory.name, name)
+
+            model = Model()
+            model.fit(self.X, self.y)
+            model.save(path)
+
+            for mmap in (True, False):
+                loaded = Model.load(path, mmap=mmap)
+
+                self.assertEqual(isinstance(loaded.labels, np.memmap), mmap,
+                                 name)
+
+                actual = loaded.score_all(self.X_test)
+                expected = model.score_all(self.X_test)
+                np.testing.assert_array_equal(actual, expected, err_msg=name)
+
+    def test_save_shared_arrays(self):
+        model = openset.models.IntegratedRankWeightedDepth(n_proj=50)
+        model.fit(self.X, self.y)
+        model.save(self.directory.name)
+
+        loaded = openset.models.IntegratedRankWeightedDepth.load(
+            self.directory.name
+        )
+
+        self.assertIs(loaded.U[0], loaded.U[1])
+        self.assertTrue(loaded.M[0].flags.f_contiguous)
+        self.assertFalse(loaded.M[0].flags.writeable)
+
+    def test_load_incorrect_class(self):
+        model = openset.models.Euclidean()
+        model.fit(self.X, self.y)
+        model.save(self.directory.name)
+
+        with self.assertRaises(TypeError):
+            openset.models.Mahalanobis.load(self.directory.name)
+
+        loaded = BaseModel.load(self.directory.name)
+        self.assertIsInstance(loaded, openset.models.Euclidean)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+from unittest import TestCase
+
+import numpy as np
+from scipy.spatial import distance
+
+from openset.models import Correlation
+from openset.models import Cosine
+from openset.models import Euclidean
+from openset.models import Manhattan
+from openset.models import Minkowski
+from openset.models import SEuclidean
+
+
+class TestCentroidModel(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.X = rng.normal(size=(50, 20))
+        self.y = rng.integers(0, 3, size=50)
+        self.X_test = rng.normal(loc=0.5, size=(30, 20))
+
+    def assertMatchesPerRow(self, model, function, **kwargs):
+        model.fit(self.X, self.y)
+
+        for label in model.labels:
+            actual = model.score(self.X_test, label)
+            expected = np.array([
+                function(vec, model.means[label],
+                         **{key: value(label) if callable(value) else value
+                            for key, value in kwargs.items()})
+                for vec in self.X_test
+            ])
+            np.testing.assert_allclose(actual, expected, rtol=1e-12)
+
+    def test_correlation(self):
+        self.assertMatchesPerRow(Correlation(), distance.correlation)
+
+    def test_cosine(self):
+        self.assertMatchesPerRow(Cosine(), distance.cosine)
+
+    def test_euclidean(self):
+        self.assertMatchesPerRow(Euclidean(), distance.euclidean)
+
+    def test_manhattan(self):
+        self.assertMatchesPerRow(Manhattan(), distance.cityblock)
+
+    def test_minkowski(self):
+        self.assertMatchesPerRow(Minkowski(3), distance.minkowski, p=3)
+
+    def test_seuclidean(self):
+        model = SEuclidean()
+        self.assertMatchesPerRow(model, distance.seuclidean,
+                                 V=lambda label: model.vars[label])
+
+    def test_score_all(self):
+        for model in (Correlation(), Cosine(), Euclidean(), Manhattan(),
+                      Minkowski(3), SEuclidean()):
+            model.fit(self.X, self.y)
+
+            actual = model.score_all(self.X_test)
+            expected = np.column_stack([model.score(self.X_test, label)
+                                        for label in model.labels])
+            np.testing.assert_allclose(actual, expected, rtol=1e-12)
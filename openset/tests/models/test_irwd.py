@@ -24,10 +24,10 @@ class TestIntegratedRankWeightedDepth(TestCase):
         np.testing.assert_almost_equal(actual, expected)
 
         actual = model.M[None]
-        expected = np.array([[0.0, 0.0, 0.0, 0.0],
-                             [-3.8386196, 3.1267168, -2.2205588, -3.7084498],
-                             [0.562361, 1.2473614, -1.6635143, 0.7495665],
-                             [-3.2762586, 4.3740782, -3.884073, -2.9588833]])
+        expected = np.array([[-3.8386196, 0.0, -3.884073, -3.7084498],
+                             [-3.2762586, 1.2473614, -2.2205588, -2.9588833],
+                             [0.0, 3.1267168, -1.6635143, 0.0],
+                             [0.562361, 4.3740782, 0.0, 0.7495665]])
         np.testing.assert_almost_equal(actual, expected)
 
     def test_score(self):
@@ -53,3 +53,67 @@ class TestIntegratedRankWeightedDepth(TestCase):
             -0.0625,
         ])
         np.testing.assert_almost_equal(actual, expected)
+
+    def test_score_matches_sign_counting(self):
+        rng = np.random.default_rng(42)
+        X = rng.normal(size=(200, 6))
+        X_test = rng.normal(loc=0.5, size=(25, 6))
+
+        model = IntegratedRankWeightedDepth(50)
+        model.fit(X)
+
+        M = np.dot(X, model.U[None])  # unsorted projections
+        expected = []
+
+        for vec in X_test:
+            M_v = M - np.dot(vec, model.U[None])
+            expected.append(-1 * sum(min((column <= 0).sum(),
+                                         (column > 0).sum())
+                                     for column in M_v.T) / 200 / 50)
+
+        actual = model.score(X_test)
+        np.testing.assert_almost_equal(actual, expected)
+
+    def test_fit_shared_directions(self):
+        rng = np.random.default_rng(42)
+        X = rng.normal(size=(60, 3))
+        y = rng.integers(0, 3, size=60)
+
+        model = IntegratedRankWeightedDepth(10)
+        model.fit(X, y)
+
+        for label in model.labels:
+            self.assertIs(model.U[label], model.U[model.labels[0]])
+
+            actual = model.M[label]
+            expected = np.sort(np.dot(X[y == label], model.U[label]), axis=0)
+            np.testing.assert_almost_equal(actual, expected)
+
+    def test_score_all(self):
+        rng = np.random.default_rng(42)
+        X = rng.normal(size=(60, 3))
+        y = rng.integers(0, 3, size=60)
+        X_test = rng.normal(size=(10, 3))
+
+        model = IntegratedRankWeightedDepth(10)
+        model.fit(X, y)
+
+        actual = model.score_all(X_test)
+        expected = np.column_stack([model.score(X_test, label)
+                                    for label in model.labels])
+        np.testing.assert_almost_equal(actual, expected)
+
+    def test_score_iter(self):
+        rng = np.random.default_rng(42)
+        X = rng.normal(size=(60, 3))
+        X_test = rng.normal(size=(25, 3))
+
+        model = IntegratedRankWeightedDepth(10)
+        model.fit(X)
+
+        chunks = list(model.score_iter(X_test, memory_budget=8 * 23 * 10))
+        self.assertEqual(len(chunks), 3)  # 10 vectors per chunk
+
+        actual = np.concatenate(chunks)
+        expected = model.score(X_test)
+        np.testing.assert_almost_equal(actual, expected)
@@ -74,3 +74,66 @@ class TestKNearestNeighbors(TestCase):
             2.425798,
         ])
         np.testing.assert_almost_equal(actual, expected)
+
+    def test_score_neighbors(self):
+        rng = np.random.default_rng(42)
+        X = rng.normal(size=(300, 4))
+        y = rng.integers(0, 3, size=300)
+        X_test = rng.normal(scale=1.5, size=(50, 4))
+
+        model = KNearestNeighbors(20)
+        model.fit(X, y)
+
+        for k in (1, 5, 10, 20):
+            single = KNearestNeighbors(k)
+            single.fit(X, y)
+
+            for label in model.labels:
+                actual = model.score_neighbors(X_test, label, [k])[:, 0]
+                expected = single.score(X_test, label)
+                np.testing.assert_allclose(actual, expected, rtol=1e-12)
+
+    def test_score_neighbors_default(self):
+        X = np.array([[0, 0], [0, 1], [0, 2], [0, 3], [0, 4]])
+
+        model = KNearestNeighbors(3)
+        model.fit(X)
+
+        actual = model.score_neighbors(np.array([[0, 0], [2, 2]]))
+        self.assertEqual(actual.shape, (2, 3))
+        np.testing.assert_allclose(actual[:, -1],
+                                   model.score(np.array([[0, 0], [2, 2]])))
+
+    def test_score_neighbors_incorrect(self):
+        X = np.array([[0, 0], [0, 1], [0, 2], [0, 3], [0, 4]])
+
+        model = KNearestNeighbors(3)
+        model.fit(X)
+
+        for n_neighbors in ([0], [4], []):
+            with self.assertRaises(ValueError):
+                model.score_neighbors(X, n_neighbors=n_neighbors)
+
+    def test_algorithm(self):
+        rng = np.random.default_rng(42)
+        X = rng.normal(size=(300, 20))
+        y = rng.integers(0, 3, size=300)
+        X_test = rng.normal(scale=1.5, size=(50, 20))
+
+        tree = KNearestNeighbors(algorithm='tree')
+        tree.fit(X, y)
+
+        brute = KNearestNeighbors(algorithm='brute')
+        brute.fit(X, y)
+
+        auto = KNearestNeighbors()
+        auto.fit(X, y)
+
+        expected = tree.score_all(X_test)
+        np.testing.assert_allclose(brute.score_all(X_test), expected,
+                                   rtol=1e-9)
+        np.testing.assert_allclose(auto.score_all(X_test), expected,
+                                   rtol=1e-9)
+        np.testing.assert_allclose(brute.score_neighbors(X_test, 1, [3, 7]),
+                                   tree.score_neighbors(X_test, 1, [3, 7]),
+                                   rtol=1e-9)
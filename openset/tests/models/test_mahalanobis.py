@@ -3,8 +3,10 @@
 from unittest import TestCase
 
 import numpy as np
+from scipy.spatial.distance import mahalanobis
 
 from openset.models import Mahalanobis
+from openset.models import MahalanobisLowRank
 from openset.models import MahalanobisSC
 
 
@@ -110,3 +112,189 @@ class TestMahalanobisSC(TestCase):
             1.7853571,
         ])
         np.testing.assert_almost_equal(actual, expected)
+
+
+class TestMahalanobisBatched(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.X = rng.normal(size=(200, 10))
+        self.y = rng.integers(0, 2, size=200)
+        self.X_test = rng.normal(loc=0.5, size=(30, 10))
+
+    def test_score_matches_scipy(self):
+        model = Mahalanobis()
+        model.fit(self.X, self.y)
+
+        for label in model.labels:
+            actual = model.score(self.X_test, label)
+            expected = np.array([
+                mahalanobis(vec, model.means[label], model.icovs[label])
+                for vec in self.X_test
+            ])
+            np.testing.assert_allclose(actual, expected, rtol=1e-10)
+
+    def test_score_float32(self):
+        model64 = Mahalanobis()
+        model64.fit(self.X, self.y)
+
+        model32 = Mahalanobis(dtype=np.float32)
+        model32.fit(self.X, self.y)
+
+        for label in model32.labels:
+            self.assertEqual(model32.chols[label].dtype, np.float32)
+
+            actual = model32.score(self.X_test, label)
+            expected = model64.score(self.X_test, label)
+            self.assertEqual(actual.dtype, np.float32)
+            np.testing.assert_allclose(actual, expected, rtol=1e-5)
+
+    def test_shared_covariance_float32(self):
+        model64 = MahalanobisSC()
+        model64.fit(self.X, self.y)
+
+        model32 = MahalanobisSC(dtype=np.float32)
+        model32.fit(self.X, self.y)
+
+        self.assertEqual(model32.chol.dtype, np.float32)
+
+        for label in model32.labels:
+            actual = model32.score(self.X_test, label)
+            expected = model64.score(self.X_test, label)
+            np.testing.assert_allclose(actual, expected, rtol=1e-5)
+
+    def test_shared_covariance_score_all(self):
+        model = MahalanobisSC()
+        model.fit(self.X, self.y)
+
+        actual = model.score_all(self.X_test)
+        expected = np.column_stack([model.score(self.X_test, label)
+                                    for label in model.labels])
+        np.testing.assert_allclose(actual, expected, rtol=1e-10)
+
+    def test_score_singular(self):
+        X = self.X[:6]  # fewer samples than dimensions
+
+        model = Mahalanobis()
+        model.fit(X)
+
+        icov = np.linalg.pinv(np.cov(X, rowvar=False), hermitian=True)
+        actual = model.score(self.X_test)
+        expected = np.array([mahalanobis(vec, X.mean(axis=0), icov)
+                             for vec in self.X_test])
+        np.testing.assert_allclose(actual, expected, rtol=1e-8)
+        np.testing.assert_allclose(model.icovs[None], icov, atol=1e-8)
+
+    def test_shared_covariance_singular(self):
+        X = self.X[:6]  # fewer samples than dimensions
+        y = np.array([0, 0, 0, 1, 1, 1])
+
+        model = MahalanobisSC()
+        model.fit(X, y)
+
+        icov = np.linalg.pinv(np.cov(X, rowvar=False), hermitian=True)
+        actual = model.score_all(self.X_test)
+        expected = np.column_stack([
+            [mahalanobis(vec, X[y == label].mean(axis=0), icov)
+             for vec in self.X_test]
+            for label in (0, 1)
+        ])
+        np.testing.assert_allclose(actual, expected, rtol=1e-8)
+
+
+class TestMahalanobisLowRank(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        rotation, _ = np.linalg.qr(rng.normal(size=(10, 10)))
+        self.X = rng.normal(size=(200, 10)) * np.arange(1, 11) @ rotation
+        self.y = rng.integers(0, 2, size=200)
+        self.X_test = rng.normal(loc=0.5, size=(30, 10))
+
+    def reference(self, data, X, rank, regularization=0.0):
+        '''Dense implementation with the low-rank covariance matrix.'''
+        mean = data.mean(axis=0)
+        values, vectors = np.linalg.eigh(np.cov(data, rowvar=False))
+        values, vectors = values[::-1], vectors[:, ::-1]
+
+        if rank < len(values):
+            residual = values[rank:].sum() / (len(values) - rank)
+        else:
+            residual = 0.0  # as in the model, if no variances are discarded
+        values = np.concatenate([values[:rank],
+                                 np.full(len(values) - rank, residual)])
+        cov = vectors @ np.diag(values + regularization) @ vectors.T
+
+        return np.array([mahalanobis(vec, mean, np.linalg.inv(cov))
+                         for vec in X])
+
+    def test_repr(self):
+        model = MahalanobisLowRank(5)
+        self.assertEqual(str(model), 'MahalanobisLowRank(5)')
+
+    def test_fit(self):
+        model = MahalanobisLowRank(3)
+        model.fit(self.X, self.y)
+
+        for label in model.labels:
+            self.assertEqual(model.components[label].shape, (10, 3))
+            self.assertEqual(model.variances[label].shape, (3, ))
+            self.assertTrue(np.all(np.diff(model.variances[label]) <= 0))
+            self.assertGreater(model.residuals[label], 0)
+
+    def test_score_full_rank(self):
+        model = MahalanobisLowRank(10)
+        model.fit(self.X, self.y)
+
+        reference = Mahalanobis()
+        reference.fit(self.X, self.y)
+
+        actual = model.score_all(self.X_test)
+        expected = reference.score_all(self.X_test)
+        np.testing.assert_allclose(actual, expected, rtol=1e-9)
+
+    def test_score_low_rank(self):
+        for rank, regularization in ((3, 0.0), (3, 0.5), (10, 0.5)):
+            model = MahalanobisLowRank(rank, regularization)
+            model.fit(self.X, self.y)
+
+            for label in model.labels:
+                actual = model.score(self.X_test, label)
+                expected = self.reference(self.X[self.y == label],
+                                          self.X_test, rank, regularization)
+                np.testing.assert_allclose(actual, expected, rtol=1e-9)
+
+    def test_score_fewer_samples_than_dimension(self):
+        rng = np.random.default_rng(42)
+        X = rng.normal(size=(20, 500))
+        X_test = np.vstack([X[:5], rng.normal(loc=2, size=(5, 500))])
+
+        model = MahalanobisLowRank(30)
+        model.fit(X)
+
+        self.assertEqual(model.components[None].shape, (500, 19))
+        self.assertEqual(model.residuals[None], 0)
+
+        # The sum of squared distances of training vectors is equal to
+        # (n - 1) times the number of the principal directions.
+        actual = np.sum(model.score(X)**2)
+        np.testing.assert_allclose(actual, 19 * 19)
+
+        model = MahalanobisLowRank(5)
+        model.fit(X)
+
+        actual = model.score(X_test)
+        expected = self.reference(X, X_test, 5)
+        np.testing.assert_allclose(actual, expected, rtol=1e-6)
+
+    def test_score_float32(self):
+        model64 = MahalanobisLowRank(3)
+        model64.fit(self.X, self.y)
+
+        model32 = MahalanobisLowRank(3, dtype=np.float32)
+        model32.fit(self.X, self.y)
+
+        for label in model32.labels:
+            self.assertEqual(model32.components[label].dtype, np.float32)
+
+            actual = model32.score(self.X_test, label)
+            expected = model64.score(self.X_test, label)
+            np.testing.assert_allclose(actual, expected, rtol=1e-4)
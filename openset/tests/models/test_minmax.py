@@ -9,6 +9,20 @@ from openset.models import MinMaxOutScore
 
 
 class TestMinMaxOutFactor(TestCase):
+    def test_score_all(self):
+        rng = np.random.default_rng(42)
+        X = rng.normal(size=(60, 4))
+        y = rng.integers(0, 3, size=60)
+        X_test = rng.normal(scale=2.0, size=(10, 4))
+
+        model = MinMaxOutFactor()
+        model.fit(X, y)
+
+        actual = model.score_all(X_test)
+        expected = np.column_stack([model.score(X_test, label)
+                                    for label in model.labels])
+        np.testing.assert_almost_equal(actual, expected)
+
     def test_fit(self):
         X = np.array([[0, 0], [0, 4], [2, 0], [2, 4]])
 
@@ -51,6 +65,20 @@ class TestMinMaxOutFactor(TestCase):
 
 
 class TestMinMaxOutScore(TestCase):
+    def test_score_all(self):
+        rng = np.random.default_rng(42)
+        X = rng.normal(size=(60, 4))
+        y = rng.integers(0, 3, size=60)
+        X_test = rng.normal(scale=2.0, size=(10, 4))
+
+        model = MinMaxOutScore()
+        model.fit(X, y)
+
+        actual = model.score_all(X_test)
+        expected = np.column_stack([model.score(X_test, label)
+                                    for label in model.labels])
+        np.testing.assert_almost_equal(actual, expected)
+
     def test_fit(self):
         X = np.array([[0, 0], [0, 4], [2, 0], [2, 4]])
 
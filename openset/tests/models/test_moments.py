@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import numpy as np
+
+from openset.models import Correlation
+from openset.models import Cosine
+from openset.models import Euclidean
+from openset.models import Mahalanobis
+from openset.models import MahalanobisSC
+from openset.models import Manhattan
+from openset.models import Minkowski
+from openset.models import MinMaxOutFactor
+from openset.models import MinMaxOutScore
+from openset.models import SEuclidean
+from openset.models.moments import label_moments
+from openset.models.moments import merge_label_moments
+from openset.models.moments import Moments
+from openset.utils import Runner
+
+
+class TestMoments(TestCase):
+    def test_from_data(self):
+        X = np.array([[0, 0], [0, 4], [2, 0], [2, 4]])
+
+        moments = Moments.from_data(X)
+
+        self.assertEqual(moments.count, 4)
+        np.testing.assert_almost_equal(moments.mean, [1, 2])
+        np.testing.assert_almost_equal(moments.var, [1, 4])
+        np.testing.assert_almost_equal(moments.min, [0, 0])
+        np.testing.assert_almost_equal(moments.max, [2, 4])
+
+    def test_update(self):
+        rng = np.random.default_rng(42)
+        X = rng.normal(loc=1e6, size=(100, 3))  # large offset on purpose
+
+        moments = Moments(3)
+        for batch in np.array_split(X, [1, 10, 10, 45]):
+            moments.update(batch)
+
+        self.assertEqual(moments.count, 100)
+        np.testing.assert_allclose(moments.mean, X.mean(axis=0), rtol=1e-12)
+        np.testing.assert_allclose(moments.var, X.var(axis=0), rtol=1e-6)
+        np.testing.assert_array_equal(moments.min, X.min(axis=0))
+        np.testing.assert_array_equal(moments.max, X.max(axis=0))
+
+    def test_scatter(self):
+        rng = np.random.default_rng(42)
+        X = rng.normal(loc=10.0, size=(100, 3))
+
+        moments = Moments.from_data(X[:30], scatter=True)
+        moments.merge(Moments.from_data(X[30:], scatter=True))
+
+        np.testing.assert_allclose(moments.sum, X.sum(axis=0), rtol=1e-12)
+        np.testing.assert_allclose(moments.cov, np.cov(X.T), rtol=1e-9)
+        np.testing.assert_allclose(moments.var, X.var(axis=0), rtol=1e-9)
+
+        with self.assertRaises(ValueError):
+            moments.merge(Moments.from_data(X))
+
+    def test_merge_label_moments(self):
+        X = np.array([[0, 0], [0, 4], [2, 0], [2, 4]])
+        y = np.array([1, 2, 1, 3])
+
+        moments = merge_label_moments(label_moments(X[:2], y[:2]),
+                                      label_moments(X[2:], y[2:]))
+
+        self.assertEqual(sorted(moments), [1, 2, 3])
+        self.assertEqual(moments[1].count, 2)
+        np.testing.assert_almost_equal(moments[1].mean, [1, 0])
+
+
+class TestMomentsModel(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.X = rng.normal(size=(90, 4))
+        self.y = rng.integers(0, 3, size=90)
+        self.X_test = rng.normal(scale=2.0, size=(10, 4))
+
+    def test_partial_fit(self):
+        for Model in (Correlation, Cosine, Euclidean, Manhattan, Minkowski,
+                      MinMaxOutFactor, MinMaxOutScore, SEuclidean):
+            model = Model()
+            model.fit(self.X, self.y)
+
+            streamed = Model()
+            for start in range(0, 90, 20):
+                streamed.partial_fit(self.X[start:start + 20],
+                                     self.y[start:start + 20])
+
+            np.testing.assert_array_equal(streamed.labels, model.labels)
+
+            actual = streamed.score_all(self.X_test)
+            expected = model.score_all(self.X_test)
+            np.testing.assert_allclose(actual, expected, rtol=1e-9)
+
+    def test_fit_drops_data(self):
+        for Model in (Mahalanobis, MahalanobisSC, MinMaxOutFactor,
+                      MinMaxOutScore, SEuclidean):
+            model = Model()
+            model.fit(self.X, self.y)
+
+            self.assertFalse(hasattr(model, 'X'))
+            self.assertFalse(hasattr(model, 'y'))
+            self.assertFalse(hasattr(model, 'index'))
+
+    def test_partial_fit_new_labels(self):
+        model = Euclidean()
+        model.partial_fit(np.array([[0, 0], [2, 2]]), np.array([3, 3]))
+        model.partial_fit(np.array([[1, 1], [4, 4]]), np.array([1, 3]))
+
+        np.testing.assert_array_equal(model.labels, [1, 3])
+        np.testing.assert_almost_equal(model.means[1], [1, 1])
+        np.testing.assert_almost_equal(model.means[3], [2, 2])
+
+    def test_partial_fit_after_fit(self):
+        model = SEuclidean()
+        model.fit(self.X[:50])
+        model.partial_fit(self.X[50:])
+
+        np.testing.assert_array_equal(model.labels, [None])
+        np.testing.assert_almost_equal(model.means[None],
+                                       self.X.mean(axis=0))
+        np.testing.assert_almost_equal(model.vars[None],
+                                       self.X.var(axis=0))
+
+    def test_fit_shards(self):
+        with TemporaryDirectory() as directory:
+            shards = []
+
+            for index, start in enumerate(range(0, 90, 30)):
+                X_path = os.path.join(directory, f'X{index}.npy')
+                y_path = os.path.join(directory, f'y{index}.npy')
+                np.save(X_path, self.X[start:start + 30])
+                np.save(y_path, self.y[start:start + 30])
+                shards.append((X_path, y_path))
+
+            for Model in (Mahalanobis, MahalanobisSC, MinMaxOutFactor,
+                          MinMaxOutScore, SEuclidean):
+                model = Model()
+                model.fit(self.X, self.y)
+
+                sharded = Model()
+                sharded.fit_shards(shards, Runner(2))
+
+                np.testing.assert_array_equal(sharded.labels, model.labels)
+
+                actual = sharded.score_all(self.X_test)
+                expected = model.score_all(self.X_test)
+                np.testing.assert_allclose(actual, expected, rtol=1e-9)
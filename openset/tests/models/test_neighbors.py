@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+from unittest import TestCase
+
+import numpy as np
+from sklearn.neighbors import KDTree
+from sklearn.neighbors import NearestNeighbors
+
+from openset.models import FastAngleBasedOutlierFactor
+from openset.models import KNearestNeighbors
+from openset.models import LocalOutlierFactor
+from openset.models.neighbors import BruteNeighbors
+from openset.models.neighbors import RandomProjectionForest
+from openset.models.neighbors import build_index
+from openset.models.neighbors import resolve_algorithm
+
+
+class TestBruteNeighbors(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.X = rng.normal(size=(200, 20))
+        self.X_test = rng.normal(scale=1.5, size=(30, 20))
+
+    def test_repr(self):
+        self.assertEqual(str(BruteNeighbors(7)), 'BruteNeighbors(7)')
+
+    def test_query(self):
+        index = BruteNeighbors().fit(self.X)
+
+        for k in (1, 10, 200):
+            actual_distances, actual_indices = index.query(self.X_test, k)
+            expected_distances, expected_indices = \
+                KDTree(self.X).query(self.X_test, k)
+
+            np.testing.assert_array_equal(actual_indices, expected_indices)
+            np.testing.assert_allclose(actual_distances, expected_distances,
+                                       rtol=1e-9)
+
+    def test_query_blocks(self):
+        index = BruteNeighbors(memory_budget=1).fit(self.X)
+
+        actual = index.query(self.X_test, 5, return_distance=False)
+        expected = KDTree(self.X).query(self.X_test, 5, return_distance=False)
+        np.testing.assert_array_equal(actual, expected)
+
+    def test_query_incorrect_k(self):
+        index = BruteNeighbors().fit(self.X)
+
+        for k in (0, 201):
+            with self.assertRaises(ValueError):
+                index.query(self.X_test, k)
+
+    def test_kneighbors(self):
+        index = BruteNeighbors(n_neighbors=5).fit(self.X)
+        reference = NearestNeighbors(n_neighbors=5).fit(self.X)
+
+        for X in (self.X_test, None):
+            actual_distances, actual_indices = index.kneighbors(X)
+            expected_distances, expected_indices = reference.kneighbors(X)
+
+            np.testing.assert_array_equal(actual_indices, expected_indices)
+            np.testing.assert_allclose(actual_distances, expected_distances,
+                                       rtol=1e-9)
+
+    def test_kneighbors_duplicates(self):
+        X = np.array([[0.0, 0.0], [0.0, 0.0], [0.0, 0.0], [1.0, 1.0]])
+        index = BruteNeighbors(n_neighbors=1).fit(X)
+
+        distances, indices = index.kneighbors()
+
+        np.testing.assert_array_equal(distances[:, 0],
+                                      [0, 0, 0, np.sqrt(2)])
+        self.assertTrue(np.all(indices[:, 0] != np.arange(4)))
+
+
+class TestRandomProjectionForest(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.X = rng.normal(size=(2000, 10))
+        self.X_test = rng.normal(size=(100, 10))
+
+    def test_fit(self):
+        index = RandomProjectionForest(n_trees=3, leaf_size=100).fit(self.X)
+
+        self.assertEqual(index.depth, 4)  # 16 leaves of 125 vectors
+        self.assertEqual(len(index.orders), 3)
+        for order in index.orders:
+            np.testing.assert_array_equal(np.sort(order), np.arange(2000))
+
+    def test_query(self):
+        index = RandomProjectionForest(n_trees=30, leaf_size=32).fit(self.X)
+        exact = BruteNeighbors().fit(self.X)
+
+        distances, indices = index.query(self.X_test, 10)
+        expected_distances, expected_indices = exact.query(self.X_test, 10)
+
+        recall = np.mean([len(set(actual) & set(expected)) / 10
+                          for actual, expected
+                          in zip(indices, expected_indices)])
+        self.assertGreater(recall, 0.9)
+
+        np.testing.assert_allclose(
+            distances, np.linalg.norm(self.X[indices]
+                                      - self.X_test[:, np.newaxis], axis=2)
+        )
+        self.assertTrue(np.all(np.diff(distances, axis=1) >= 0))
+        self.assertTrue(np.all(distances >= expected_distances - 1e-9))
+        for row in indices:
+            self.assertEqual(len(set(row)), 10)
+
+    def test_query_exact(self):
+        exact = BruteNeighbors().fit(self.X)
+
+        for index in (RandomProjectionForest(leaf_size=5).fit(self.X),
+                      RandomProjectionForest(leaf_size=1500).fit(self.X)):
+            actual = index.query(self.X_test, 10, return_distance=False)
+            expected = exact.query(self.X_test, 10, return_distance=False)
+            np.testing.assert_array_equal(actual, expected)
+
+    def test_kneighbors(self):
+        index = RandomProjectionForest(n_neighbors=5).fit(self.X)
+
+        indices = index.kneighbors(return_distance=False)
+
+        self.assertEqual(indices.shape, (2000, 5))
+        self.assertTrue(np.all(indices != np.arange(2000)[:, np.newaxis]))
+
+    def test_models(self):
+        y = np.arange(2000) % 2
+        prototype = RandomProjectionForest(n_trees=5)
+
+        for Model in (FastAngleBasedOutlierFactor, KNearestNeighbors,
+                      LocalOutlierFactor):
+            for algorithm in ('rpforest', prototype):
+                model = Model(algorithm=algorithm)
+                model.fit(self.X, y)
+
+                actual = model.score_all(self.X_test)
+                self.assertEqual(actual.shape, (100, 2))
+                self.assertTrue(np.all(np.isfinite(actual)))
+
+        self.assertFalse(hasattr(prototype, 'data'))
+
+
+class TestAlgorithm(TestCase):
+    def test_resolve_algorithm(self):
+        self.assertEqual(resolve_algorithm('auto', 2), 'tree')
+        self.assertEqual(resolve_algorithm('auto', 1000), 'brute')
+        self.assertEqual(resolve_algorithm('tree', 1000), 'tree')
+        self.assertEqual(resolve_algorithm('brute', 2), 'brute')
+
+        with self.assertRaises(ValueError):
+            resolve_algorithm('ball_tree', 2)
+
+    def test_build_index(self):
+        X = np.zeros((10, 2))
+
+        self.assertIsInstance(build_index(X), KDTree)
+        self.assertIsInstance(build_index(X, 'brute'), BruteNeighbors)
+        self.assertIsInstance(build_index(X, 'rpforest'),
+                              RandomProjectionForest)
+
+        prototype = RandomProjectionForest(n_trees=3)
+        index = build_index(X, prototype, n_neighbors=4)
+        self.assertIsNot(index, prototype)
+        self.assertEqual((index.n_trees, index.n_neighbors), (3, 4))
@@ -1,10 +1,12 @@
 #!/usr/bin/env python3
 
+import os
 from unittest import TestCase
 from unittest.mock import MagicMock
 from unittest.mock import patch
 
 from openset.utils import Runner
+from openset.utils.runner import _limit_threads
 
 
 class TestRunner(TestCase):
@@ -129,6 +131,29 @@ class TestRunner(TestCase):
         mock_tqdm.assert_called_once_with((1, 4, 9, 16), total=4)
         self.assertEqual(handler.call_count, 4)
 
+    @patch('openset.utils.runner.tqdm')
+    @patch('openset.utils.runner.Pool')
+    def test_reduce(self, mock_pool, mock_tqdm):
+        mock_pool_instance = mock_pool.return_value.__enter__.return_value
+        mock_pool_instance.imap.return_value = ['a', 'b', 'c']
+        mock_tqdm.return_value = ['a', 'b', 'c']
+
+        runner = Runner()
+        handler = MagicMock()
+        runner.set_handler(handler)
+
+        function = MagicMock()
+        arguments = (1, 2, 3)
+        result = runner.reduce(lambda x, y: x + y, '>', function, arguments)
+
+        mock_pool_instance.imap.assert_called_once_with(
+            func=function,
+            iterable=arguments
+        )
+        mock_pool_instance.imap_unordered.assert_not_called()
+        self.assertEqual(result, '>abc')
+        self.assertEqual(runner.handler, handler)
+
     def test_run_without_function(self):
         runner = Runner()
 
@@ -170,3 +195,24 @@ class TestRunner(TestCase):
         runner._starmap(args)
 
         runner.function.assert_called_with(1, 2, 3, 4, 5)
+
+    @patch('openset.utils.runner.tqdm')
+    @patch('openset.utils.runner.cpu_count')
+    @patch('openset.utils.runner.Pool')
+    def test_run_limits_threads(self, mock_pool, mock_cpu_count, mock_tqdm):
+        mock_cpu_count.return_value = 8
+
+        runner = Runner(2)
+        runner.run(MagicMock(), (1, 2, 3, 4))
+
+        mock_pool.assert_called_once_with(processes=2,
+                                          initializer=_limit_threads,
+                                          initargs=(4, ))
+
+    @patch('openset.utils.runner.threadpool_limits')
+    @patch.dict('openset.utils.runner.os.environ')
+    def test_limit_threads(self, mock_threadpool_limits):
+        _limit_threads(3)
+
+        self.assertEqual(os.environ['OPENSET_NUM_THREADS'], '3')
+        mock_threadpool_limits.assert_called_once_with(limits=3)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+from functools import partial
+from multiprocessing import shared_memory
+import pickle
+from unittest import TestCase
+from unittest.mock import patch
+
+import numpy as np
+
+from openset.models import FastAngleBasedOutlierFactor
+from openset.models import IntegratedRankWeightedDepth
+from openset.utils import Runner
+from openset.utils import SharedModel
+from openset.utils.shared import _ATTACHED
+
+
+def score(shared, label):
+    return label, shared.model.score(shared.model.X[:10], label)
+
+
+class TestSharedModel(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.X = rng.normal(size=(200, 5))
+        self.y = rng.integers(0, 3, size=200)
+        self.X_test = rng.normal(scale=1.5, size=(20, 5))
+
+        self.model = IntegratedRankWeightedDepth(n_proj=50)
+        self.model.fit(self.X, self.y)
+
+    def test_model(self):
+        shared = SharedModel(self.model)
+        self.addCleanup(shared.close)
+
+        model = pickle.loads(pickle.dumps(shared)).model
+
+        self.assertIs(model, shared.model)
+        self.assertIs(model.U[0], model.U[1])
+        self.assertFalse(model.X.flags.writeable)
+        self.assertTrue(model.M[0].flags.f_contiguous)
+        np.testing.assert_array_equal(model.score_all(self.X_test),
+                                      self.model.score_all(self.X_test))
+
+    def test_pickled_size(self):
+        shared = SharedModel(self.model)
+        self.addCleanup(shared.close)
+
+        self.assertLess(len(pickle.dumps(shared)),
+                        len(pickle.dumps(self.model)) / 10)
+
+    def test_close(self):
+        shared = SharedModel(self.model)
+        names = list(shared.arrays)
+
+        shared.close()
+        shared.close()  # No exception should raise here
+
+        for name in names:
+            with self.assertRaises(FileNotFoundError):
+                shared_memory.SharedMemory(name=name)
+
+    def test_close_detaches(self):
+        shared = SharedModel(self.model)
+        copy = pickle.loads(pickle.dumps(shared))  # as in worker processes
+        copy.model
+
+        self.assertIn(shared.token, _ATTACHED)
+        blocks = list(_ATTACHED[shared.token][1].values())
+
+        copy.close()
+        self.assertNotIn(shared.token, _ATTACHED)
+        self.assertTrue(all(block.buf is None for block in blocks))
+
+        # The blocks are still available until closed by the publisher
+        np.testing.assert_array_equal(copy.model.X, self.model.X)
+        shared.close()
+        self.assertNotIn(shared.token, _ATTACHED)
+
+    def test_failed_dump(self):
+        names = []
+        store = SharedModel._store
+
+        def failing_store(self, array, number):
+            if names:
+                raise RuntimeError('failed')
+
+            names.append(store(self, array, number))
+            return names[-1]
+
+        with patch.object(SharedModel, '_store', failing_store):
+            with self.assertRaises(RuntimeError):
+                SharedModel(self.model)
+
+        self.assertEqual(len(names), 1)
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=names[0])
+
+    def test_runner(self):
+        model = FastAngleBasedOutlierFactor()
+        model.fit(self.X, self.y)
+        results = {}
+
+        with Runner(2) as runner:
+            shared = runner.share(model)
+            runner.run(partial(score, shared), list(model.labels),
+                       lambda result: results.update([result]))
+
+            self.assertEqual(runner.shared, [shared])
+
+        self.assertEqual(runner.shared, [])
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=list(shared.arrays)[0])
+
+        for label in model.labels:
+            np.testing.assert_array_equal(results[label],
+                                          model.score(model.X[:10], label))
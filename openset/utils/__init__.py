@@ -3,10 +3,12 @@
 from ..utils.cache import MemCache
 from ..utils.cache import SQLCache
 from ..utils.runner import Runner
+from ..utils.shared import SharedModel
 
 
 __all__ = [
     'MemCache',
     'SQLCache',
     'Runner',
+    'SharedModel',
 ]
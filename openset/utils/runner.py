@@ -2,10 +2,25 @@
 
 from multiprocessing import Pool
 from numbers import Number
+import os
 
 from psutil import cpu_count
+from threadpoolctl import threadpool_limits
 from tqdm import tqdm
 
+from ..utils.shared import SharedModel
+
+
+def _limit_threads(threads):
+    '''Limits the number of threads used in the worker process.
+
+    Both the BLAS libraries and the models (via the OPENSET_NUM_THREADS
+    environment variable, see BaseModel) are limited, so the processes
+    of the pool together do not use more threads than the CPU cores.
+    '''
+    os.environ['OPENSET_NUM_THREADS'] = str(threads)
+    threadpool_limits(limits=threads)
+
 
 class Runner(object):
     '''Tool for parallelizing function calls with multiple arguments.
@@ -25,9 +40,16 @@ class Runner(object):
         self.handler = None
         self.nproc = None
         self.length = None
+        self.shared = []
 
         self.set_nproc(nproc)
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
     def set_nproc(self, nproc=None):
         '''Specify the number of concurrent processes to run in the pool.
 
@@ -38,6 +60,30 @@ class Runner(object):
         else:
             self.nproc = cpu_count(logical=False)
 
+    def share(self, model):
+        '''Publish the fitted model in shared memory for the worker processes.
+
+        Returns the SharedModel handle, that should be passed to the function
+        (e.g. with functools.partial) instead of the model itself, so the model
+        arrays are not pickled for each function call; the function gets the
+        model from the handle's `model` attribute. The shared memory is kept
+        until the runner is closed (see close()).
+        '''
+        shared = SharedModel(model)
+        self.shared.append(shared)
+
+        return shared
+
+    def close(self):
+        '''Release the shared memory of all models published by the runner.
+
+        Called automatically when the runner is used as a context manager.
+        '''
+        for shared in self.shared:
+            shared.close()
+
+        self.shared.clear()
+
     def set_function(self, function):
         '''Specify the main function to run in parallel in the pool.
 
@@ -80,12 +126,16 @@ class Runner(object):
         self.length = length
 
     def run(self, function=None, arguments=None,
-            handler=None, unpack=False, length=None):
+            handler=None, unpack=False, length=None, ordered=False):
         '''Main runner method – creates a pool of processes.
 
         Optionally, if arguments is a collection of collections, such as
         a list of tuples, it is possible to unpack the arguments for each
         function call by setting the `unpack` keyword argument to `True`.
+
+        By default, the results are handled in the order of completion.
+        Setting the `ordered` keyword argument to `True` makes the results
+        handled in the order of arguments instead.
         '''
         if function:
             self.set_function(function)
@@ -104,8 +154,12 @@ class Runner(object):
         #
         # Pool creation
         #
-        with Pool(processes=self.nproc) as pool:
-            results = pool.imap_unordered(
+        threads = max(1, (cpu_count(logical=False) or 1) // self.nproc)
+
+        with Pool(processes=self.nproc, initializer=_limit_threads,
+                  initargs=(threads, )) as pool:
+            imap = pool.imap if ordered else pool.imap_unordered
+            results = imap(
                 func=(self._starmap if unpack else self.function),
                 iterable=self.arguments,
             )
@@ -117,6 +171,29 @@ class Runner(object):
             #
             self._handle(results)
 
+    def reduce(self, reducer, initial, function=None, arguments=None,
+               unpack=False, length=None):
+        '''Runs the pool and reduces the results into a single value.
+
+        The reducer function takes the value accumulated so far and a single
+        result of the main function, and returns the new accumulated value,
+        starting from the given initial value. The results are reduced in
+        the order of arguments, so the outcome is deterministic.
+        '''
+        accumulator = [initial]
+        handler = self.handler
+
+        def reduce_handler(result):
+            accumulator[0] = reducer(accumulator[0], result)
+
+        try:
+            self.run(function, arguments, reduce_handler,
+                     unpack=unpack, length=length, ordered=True)
+        finally:
+            self.handler = handler
+
+        return accumulator[0]
+
     def _handle(self, results):
         '''The helper function to process the main function calls results.'''
         if hasattr(self.arguments, '__len__'):
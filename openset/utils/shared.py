@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+
+import io
+from multiprocessing import shared_memory
+import uuid
+import weakref
+
+import numpy as np
+
+from ..models.base import _ArrayPickler
+from ..models.base import _ArrayUnpickler
+
+
+# The models attached in the current process, together with the shared memory
+# blocks that must stay open for as long as the arrays of models are in use
+# (i.e. the process lifetime).
+_ATTACHED = {}
+
+
+def _release(blocks):
+    '''Closes and removes the shared memory blocks.'''
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+
+def _detach(token):
+    '''Drops the model attached in the current process and its mappings.'''
+    model, blocks = _ATTACHED.pop(token, (None, {}))
+    del model  # the arrays must be released before closing the blocks
+
+    for block in blocks.values():
+        try:
+            block.close()
+        except BufferError:
+            # The arrays are still referenced elsewhere, so the block is closed
+            # when they are collected.
+            pass
+
+
+class SharedModel(object):
+    '''Fitted model published in the shared memory.
+
+    The arrays of a model (e.g. the training data) are copied once into
+    the shared memory blocks, while the handle holds only the rest of model
+    state and the description of arrays, so it is cheap to send to worker
+    processes (e.g. as an argument of the function run by the Runner).
+    In each process, the model is restored on the first access to the model
+    attribute, with all arrays being read-only views of the shared memory.
+
+    The blocks are removed with close(), or by the Runner that published
+    the model (see Runner.share()); the model must not be used afterwards.
+    In other processes, close() only detaches the model from the blocks.
+    '''
+
+    def __init__(self, model):
+        self.token = uuid.uuid4().hex
+        self.arrays = {}
+        self.blocks = []
+
+        self._finalizer = weakref.finalize(self, _release, self.blocks)
+
+        buffer = io.BytesIO()
+        try:
+            _ArrayPickler(buffer, self._store).dump(model)
+        except Exception:
+            self._finalizer()  # the blocks stored before the failure
+            raise
+        self.state = buffer.getvalue()
+
+    def __getstate__(self):
+        return {
+            'token': self.token,
+            'arrays': self.arrays,
+            'state': self.state,
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.blocks = []
+        self._finalizer = None  # only the publishing process owns blocks
+
+    @property
+    def model(self):
+        '''The model attached to the shared memory in the current process.'''
+        if self.token not in _ATTACHED:
+            blocks = {name: shared_memory.SharedMemory(name=name)
+                      for name in self.arrays}
+
+            def load(name):
+                shape, dtype, order = self.arrays[name]
+                array = np.ndarray(shape, dtype, buffer=blocks[name].buf,
+                                   order=order)
+                array.flags.writeable = False
+                return array
+
+            model = _ArrayUnpickler(io.BytesIO(self.state), load).load()
+            _ATTACHED[self.token] = (model, blocks)
+
+        return _ATTACHED[self.token][0]
+
+    def close(self):
+        '''Detaches the model and removes the blocks (if published here).'''
+        _detach(self.token)
+
+        if self._finalizer is not None:
+            self._finalizer()
+
+    def _store(self, array, number):
+        '''Copies the array to a new shared memory block.'''
+        block = shared_memory.SharedMemory(create=True,
+                                           size=max(1, array.nbytes))
+        self.blocks.append(block)
+
+        order = 'F' if array.flags.f_contiguous \
+            and not array.flags.c_contiguous else 'C'
+        view = np.ndarray(array.shape, array.dtype, buffer=block.buf,
+                          order=order)
+        view[...] = array
+        del view  # the block cannot be closed while the buffer is exported
+
+        self.arrays[block.name] = (array.shape, array.dtype, order)
+
+        return block.name